@@ -0,0 +1,32 @@
+import io
+import random
+import sys
+import timeit
+
+from benchmarks.corpus import CorpusShape, DEFAULT_BLOCK_MIX, generate_block
+from markdown import scan_markdown, scan_title, extract_title, markdown_to_html_node
+
+SIZES = [1000, 4000, 16000, 64000]
+
+
+def generate_document(blocks, seed=0):
+    rng = random.Random(seed)
+    shape = CorpusShape()
+    block_types = rng.choices(list(DEFAULT_BLOCK_MIX), list(DEFAULT_BLOCK_MIX.values()), k=blocks)
+    return "\n\n".join(generate_block(rng, shape, block_type) for block_type in block_types)
+
+
+def run(sizes=SIZES):
+    print(f"{'blocks':>8}{'scan ms':>12}{'us/block':>10}{'html ms':>12}{'us/block':>10}{'title ms':>12}{'pre-scan ms':>12}")
+    for size in sizes:
+        markdown = "# Title\n\n" + generate_document(size)
+        scan = min(timeit.repeat(lambda: scan_markdown(markdown), number=1, repeat=3))
+        html = min(timeit.repeat(lambda: markdown_to_html_node(markdown), number=1, repeat=3))
+        title = min(timeit.repeat(lambda: extract_title(markdown), number=1, repeat=3))
+        pre_scan = min(timeit.repeat(lambda: scan_title(io.StringIO(markdown)), number=1, repeat=3))
+        print(f"{size:>8}{scan * 1000:>12.2f}{scan * 1e6 / size:>10.2f}{html * 1000:>12.2f}{html * 1e6 / size:>10.2f}"
+              f"{title * 1000:>12.2f}{pre_scan * 1000:>12.2f}")
+
+
+if __name__ == "__main__":
+    run([int(size) for size in sys.argv[1:]] or SIZES)
@@ -0,0 +1,23 @@
+import sys
+import time
+
+from benchmarks.corpus import CorpusShape, generate_pages
+from builder import Site
+
+TEMPLATE = "<html><head><title>{{ Title }}</title><link href=\"/index.css\" /></head><body>{{ Content }}</body></html>"
+
+
+def run(pages=2000, jobs=(1, 2, 4)):
+    sources = [(f"page{index}.md", markdown) for index, (_, markdown) in enumerate(generate_pages(CorpusShape(pages=pages)))]
+    print(f"{'jobs':>6}{'pages':>8}{'seconds':>10}{'pages/s':>10}")
+    for job_count in jobs:
+        with Site(TEMPLATE, jobs=job_count) as site:
+            list(site.render_many(sources[:job_count * 4]))
+            start = time.perf_counter()
+            rendered = sum(1 for page in site.render_many(sources) if not page.error)
+            seconds = time.perf_counter() - start
+        print(f"{job_count:>6}{rendered:>8}{seconds:>10.3f}{rendered / seconds:>10.0f}")
+
+
+if __name__ == "__main__":
+    run(*[int(arg) for arg in sys.argv[1:2]])
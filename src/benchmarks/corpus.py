@@ -0,0 +1,106 @@
+import os
+import random
+
+WORDS = (
+    "the ring hobbit wizard elf shire road mountain river forest council fellowship king steward "
+    "tower shadow light song tale age star ship gate bridge horn sword lore map quest journey"
+).split()
+DEFAULT_BLOCK_MIX = {
+    "paragraph": 6,
+    "heading": 2,
+    "unordered_list": 2,
+    "ordered_list": 1,
+    "quote": 1,
+    "code": 1,
+}
+EMPHASIS = ["**{}**", "*{}*", "_{}_", "`{}`"]
+
+
+class CorpusShape:
+
+    def __init__(self, pages=200, depth=3, blocks=40, block_mix=None, link_density=0.05, emphasis_density=0.1, images=1, seed=0):
+        self.pages = pages
+        self.depth = depth
+        self.blocks = blocks
+        self.block_mix = block_mix if block_mix else DEFAULT_BLOCK_MIX
+        self.link_density = link_density
+        self.emphasis_density = emphasis_density
+        self.images = images
+        self.seed = seed
+
+    def to_json(self):
+        return dict(vars(self))
+
+    def __repr__(self):
+        return f"CorpusShape({self.to_json()})"
+
+
+def page_path(index, shape):
+    parts = []
+    for level in range(shape.depth):
+        parts.append(f"section-{(index // (4 ** level)) % 4}")
+    parts.append(f"page-{index}")
+    return "/".join(parts)
+
+
+def generate_sentence(rng, shape, words=12):
+    sentence = []
+    for _ in range(words):
+        word = rng.choice(WORDS)
+        roll = rng.random()
+        if roll < shape.link_density:
+            word = f"[{word}](/{page_path(rng.randrange(shape.pages), shape)})"
+        elif roll < shape.link_density + shape.emphasis_density:
+            word = rng.choice(EMPHASIS).format(word)
+        sentence.append(word)
+    return " ".join(sentence).capitalize() + "."
+
+
+def generate_block(rng, shape, block_type):
+    match block_type:
+        case "paragraph":
+            return " ".join(generate_sentence(rng, shape) for _ in range(rng.randint(2, 5)))
+        case "heading":
+            return f"{'#' * rng.randint(2, 4)} {generate_sentence(rng, shape, 5)}"
+        case "unordered_list":
+            return "\n".join(f"- {generate_sentence(rng, shape, 6)}" for _ in range(rng.randint(2, 6)))
+        case "ordered_list":
+            return "\n".join(f"{i + 1}. {generate_sentence(rng, shape, 6)}" for i in range(rng.randint(2, 6)))
+        case "quote":
+            return "\n".join(f"> {generate_sentence(rng, shape, 8)}" for _ in range(rng.randint(1, 3)))
+        case "code":
+            return "```\n" + "\n".join(f"{rng.choice(WORDS)} = {rng.randint(0, 99)}" for _ in range(rng.randint(2, 8))) + "\n```"
+        case _:
+            raise ValueError(f"invalid block type: {block_type}")
+
+
+def generate_markdown(rng, shape, title):
+    block_types = list(shape.block_mix)
+    weights = [shape.block_mix[block_type] for block_type in block_types]
+    blocks = [f"# {title}"]
+    for _ in range(shape.images):
+        blocks.append(f"![{rng.choice(WORDS)}](/images/{rng.choice(WORDS)}.png)")
+    for block_type in rng.choices(block_types, weights, k=shape.blocks):
+        blocks.append(generate_block(rng, shape, block_type))
+    return "\n\n".join(blocks) + "\n"
+
+
+def generate_pages(shape):
+    rng = random.Random(shape.seed)
+    return [(page_path(index, shape), generate_markdown(rng, shape, f"Page {index}")) for index in range(shape.pages)]
+
+
+def generate_paragraphs(shape, count=5000):
+    rng = random.Random(shape.seed)
+    return [generate_block(rng, shape, "paragraph") for _ in range(count)]
+
+
+def write_corpus(root, shape):
+    paths = []
+    for path, markdown in generate_pages(shape):
+        file_path = os.path.join(root, *path.split("/"), "index.md")
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w") as md_file:
+            md_file.write(markdown)
+        paths.append(file_path)
+    return paths
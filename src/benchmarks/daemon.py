@@ -0,0 +1,71 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus import CorpusShape, generate_pages
+from daemon import RenderClient
+
+MAIN_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+TEMPLATE = "<html><head><title>{{ Title }}</title><link href=\"/index.css\" /></head><body>{{ Content }}</body></html>"
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def report(name, samples, total):
+    print(f"{name:<8}{len(samples):>8}{percentile(samples, 0.5) * 1000:>10.2f}{percentile(samples, 0.95) * 1000:>10.2f}"
+          f"{len(samples) / total:>12.1f}")
+
+
+def cold_cli(root, pages, runs):
+    samples = []
+    for markdown in pages[:runs]:
+        with open(os.path.join(root, "content", "index.md"), "w") as md_file:
+            md_file.write(markdown)
+        start = time.perf_counter()
+        subprocess.run([sys.executable, MAIN_PATH, "--no-cache"], cwd=root, check=True, stdout=subprocess.DEVNULL)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def warm_daemon(root, pages, requests):
+    socket_path = os.path.join(root, "render.sock")
+    process = subprocess.Popen([sys.executable, MAIN_PATH, "daemon", "--socket", socket_path], cwd=root, stdout=subprocess.DEVNULL)
+    try:
+        while not os.path.exists(socket_path):
+            time.sleep(0.01)
+        with RenderClient(socket_path) as client:
+            client.ping()
+            samples = []
+            for index in range(requests):
+                start = time.perf_counter()
+                client.render(pages[index % len(pages)])
+                samples.append(time.perf_counter() - start)
+    finally:
+        process.terminate()
+        process.wait()
+    return samples
+
+
+def run(runs=5, requests=200):
+    pages = [markdown for _, markdown in generate_pages(CorpusShape(pages=50, blocks=10))]
+    with tempfile.TemporaryDirectory() as root:
+        os.makedirs(os.path.join(root, "content"))
+        os.makedirs(os.path.join(root, "static"))
+        with open(os.path.join(root, "template.html"), "w") as template_file:
+            template_file.write(TEMPLATE)
+        print(f"{'mode':<8}{'renders':>8}{'p50 ms':>10}{'p95 ms':>10}{'renders/s':>12}")
+        start = time.perf_counter()
+        samples = cold_cli(root, pages, runs)
+        report("cli", samples, time.perf_counter() - start)
+        start = time.perf_counter()
+        samples = warm_daemon(root, pages, requests)
+        report("daemon", samples, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    run(*[int(arg) for arg in sys.argv[1:3]])
@@ -0,0 +1,39 @@
+import sys
+import time
+
+from highlight import highlight_memo
+from markdown import markdown_to_html_node
+
+SNIPPET = '''```python
+@cache
+def render(path, markdown, retries=3):  # sample {index}
+    for attempt in range(retries):
+        html = markdown_to_html(markdown, "/blog/{index}")
+        if len(html) > 0x400:
+            return html
+    raise ValueError(f"Failed to render {{path}}")
+```'''
+
+
+def make_page(snippets, index):
+    return "\n\n".join(SNIPPET.format(index=index * snippets + snippet) for snippet in range(snippets))
+
+
+def measure(pages, memo_size):
+    highlight_memo.resize(memo_size)
+    start = time.perf_counter()
+    for markdown in pages:
+        markdown_to_html_node(markdown).to_html()
+    return time.perf_counter() - start
+
+
+def run(pages=200, snippets=20):
+    site = [make_page(snippets, index) for index in range(pages)]
+    print(f"{'run':<16}{'snippets':>10}{'seconds':>10}")
+    print(f"{'no memo':<16}{pages * snippets:>10}{measure(site, 0):>10.3f}")
+    print(f"{'cold memo':<16}{pages * snippets:>10}{measure(site, pages * snippets):>10.3f}")
+    print(f"{'warm rebuild':<16}{pages * snippets:>10}{measure(site, pages * snippets):>10.3f}")
+
+
+if __name__ == "__main__":
+    run(*[int(arg) for arg in sys.argv[1:3]])
@@ -0,0 +1,41 @@
+import sys
+import timeit
+from functools import reduce
+from textnode import TextNode, TextType, text_to_textnodes, split_nodes_delimiter, split_nodes_image, split_nodes_link
+
+SIZES = [500, 1000, 2000, 4000, 8000, 16000]
+PARAGRAPHS = {
+    "link-heavy": "see [page {i}](/blog/page-{i}) and ![image {i}](/images/{i}.png) then ",
+    "emphasis-heavy": "a **bold {i}** and *italic* or _other_ with `code {i}` then ",
+}
+
+
+def chained_text_to_textnodes(text):
+    delimiters = {'**':TextType.BOLD, "*":TextType.ITALIC, "_":TextType.ITALIC, "`":TextType.CODE}
+    return split_nodes_link(
+        split_nodes_image(
+            reduce(lambda accumulator, delimiter: split_nodes_delimiter(accumulator, delimiter, delimiters[delimiter]),
+                    delimiters,
+                    [TextNode(text, TextType.TEXT)])
+            )
+        )
+
+
+def best_time(function, text, repeat=3):
+    return min(timeit.repeat(lambda: function(text), number=1, repeat=repeat))
+
+
+def run(sizes=SIZES):
+    print(f"{'paragraph':<16}{'units':>8}{'chained ms':>14}{'single-pass ms':>16}{'us/unit':>10}{'speedup':>10}")
+    for name, unit in PARAGRAPHS.items():
+        for size in sizes:
+            text = "".join(unit.format(i=i) for i in range(size))
+            if chained_text_to_textnodes(text) != text_to_textnodes(text):
+                raise AssertionError(f"{name} paragraph with {size} units renders differently")
+            chained = best_time(chained_text_to_textnodes, text)
+            single_pass = best_time(text_to_textnodes, text)
+            print(f"{name:<16}{size:>8}{chained * 1000:>14.2f}{single_pass * 1000:>16.2f}{single_pass * 1e6 / size:>10.2f}{chained / single_pass:>9.1f}x")
+
+
+if __name__ == "__main__":
+    run([int(size) for size in sys.argv[1:]] or SIZES)
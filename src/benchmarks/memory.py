@@ -0,0 +1,68 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tarfile
+import tempfile
+from io import BytesIO
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKLOAD = """
+import json, resource, sys
+sys.path.insert(0, sys.argv[1])
+from markdown import markdown_to_html_node
+blocks = int(sys.argv[2])
+parts = []
+for i in range(blocks):
+    match i % 5:
+        case 0:
+            parts.append(f"## Section {i}")
+        case 1:
+            parts.append(f"Paragraph {i} with **bold**, *italic* and `code` plus a [link](/page/{i}) and more plain words.")
+        case 2:
+            parts.append("\\n".join(f"- item {i}.{j} with _emphasis_" for j in range(4)))
+        case 3:
+            parts.append(f"> quoted line {i}\\n> and another one")
+        case 4:
+            parts.append("\\n".join(f"{j + 1}. step {j} of {i}" for j in range(3)))
+markdown = "\\n\\n".join(parts)
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+tree = markdown_to_html_node(markdown)
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"rss_before_kb": before, "rss_peak_kb": peak}))
+"""
+
+
+def measure(src_dir, blocks):
+    output = subprocess.run([sys.executable, "-c", WORKLOAD, src_dir, str(blocks)], capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+
+def export_revision(revision, dest_dir):
+    archive = subprocess.run(["git", "archive", revision, "src"], cwd=os.path.dirname(SRC_DIR), capture_output=True, check=True).stdout
+    with tarfile.open(fileobj=BytesIO(archive)) as tar:
+        tar.extractall(dest_dir, filter="data")
+    return os.path.join(dest_dir, "src")
+
+
+def report(label, result):
+    print(f"{label:<24}{result['rss_peak_kb'] / 1024:>12.1f}{(result['rss_peak_kb'] - result['rss_before_kb']) / 1024:>14.1f}")
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description="Peak RSS of markdown_to_html_node on a synthetic document.")
+    parser.add_argument("--blocks", type=int, default=50000, help="number of markdown blocks (default: 50000)")
+    parser.add_argument("--baseline", help="git revision to compare the working tree against, e.g. HEAD~1")
+    args = parser.parse_args(args)
+    print(f"{args.blocks} blocks")
+    print(f"{'source':<24}{'peak MB':>12}{'parse MB':>14}")
+    if args.baseline:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            report(args.baseline, measure(export_revision(args.baseline, tmp_dir), args.blocks))
+    report("working tree", measure(SRC_DIR, args.blocks))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
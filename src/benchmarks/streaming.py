@@ -0,0 +1,61 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.corpus import CorpusShape, DEFAULT_BLOCK_MIX, generate_block
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKLOAD = """
+import contextlib, io, json, resource, sys, time
+sys.path.insert(0, sys.argv[1])
+import content
+from template import Template
+content.STREAMING_THRESHOLD = int(sys.argv[4])
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    content.generate_page(sys.argv[2], Template("<title>{{ Title }}</title>{{ Content }}"), sys.argv[3])
+print(json.dumps({"seconds": time.perf_counter() - start, "rss_peak_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+"""
+
+
+def write_document(path, megabytes, seed=0):
+    rng = random.Random(seed)
+    shape = CorpusShape()
+    block_types = list(DEFAULT_BLOCK_MIX)
+    weights = list(DEFAULT_BLOCK_MIX.values())
+    written = 0
+    with open(path, "w") as md_file:
+        md_file.write("# Reference\n\n")
+        while written < megabytes * 1024 * 1024:
+            block = generate_block(rng, shape, rng.choices(block_types, weights)[0]) + "\n\n"
+            written += md_file.write(block)
+
+
+def measure(md_path, html_path, threshold):
+    output = subprocess.run([sys.executable, "-c", WORKLOAD, SRC_DIR, md_path, html_path, str(threshold)],
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description="Peak RSS of generate_page on one large markdown file, in memory vs streamed.")
+    parser.add_argument("--megabytes", type=int, nargs="+", default=[25, 50, 100], help="document sizes to render")
+    args = parser.parse_args(args)
+    print(f"{'size MB':>8}{'mode':>12}{'seconds':>10}{'peak MB':>10}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        md_path = os.path.join(tmp_dir, "page.md")
+        html_path = os.path.join(tmp_dir, "page.html")
+        for megabytes in args.megabytes:
+            write_document(md_path, megabytes)
+            for mode, threshold in [("in-memory", sys.maxsize), ("streamed", 0)]:
+                result = measure(md_path, html_path, threshold)
+                print(f"{megabytes:>8}{mode:>12}{result['seconds']:>10.2f}{result['rss_peak_kb'] / 1024:>10.1f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,133 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import timeit
+
+from benchmarks.corpus import CorpusShape, generate_pages, generate_paragraphs, write_corpus
+from content import generate_pages_recursive
+from markdown import inline_memo, markdown_to_html_node
+from textnode import text_to_textnodes
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+TEMPLATE = "<html><head><title>{{ Title }}</title><link href=\"/index.css\" /></head><body>{{ Content }}</body></html>"
+
+
+def clear_inline_memo():
+    max_entries = inline_memo.max_entries
+    inline_memo.resize(0)
+    inline_memo.resize(max_entries)
+
+
+def best_time(function, repeat):
+    # Every run starts from an empty inline memo, otherwise only the first one pays for parsing.
+    return min(timeit.repeat(function, setup=clear_inline_memo, number=1, repeat=repeat))
+
+
+def run_suite(shape, repeat=5):
+    pages = [markdown for _, markdown in generate_pages(shape)]
+    paragraphs = generate_paragraphs(shape)
+    trees = [markdown_to_html_node(markdown) for markdown in pages]
+    results = {
+        "markdown_to_html_node": best_time(lambda: [markdown_to_html_node(markdown) for markdown in pages], repeat),
+        "text_to_textnodes": best_time(lambda: [text_to_textnodes(paragraph) for paragraph in paragraphs], repeat),
+        "to_html": best_time(lambda: [tree.to_html() for tree in trees], repeat),
+    }
+    with tempfile.TemporaryDirectory() as root:
+        content_dir = os.path.join(root, "content")
+        template_path = os.path.join(root, "template.html")
+        write_corpus(content_dir, shape)
+        with open(template_path, "w") as template_file:
+            template_file.write(TEMPLATE)
+        with contextlib.redirect_stdout(io.StringIO()):
+            results["generate_pages_recursive"] = best_time(
+                lambda: generate_pages_recursive(content_dir, template_path, os.path.join(root, "docs"), "/"), repeat
+            )
+    return results
+
+
+def load_baseline(path):
+    if not os.path.isfile(path):
+        return None
+    with open(path) as baseline_file:
+        return json.load(baseline_file)
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "system": platform.system(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def save_baseline(path, shape, results):
+    with open(path, "w") as baseline_file:
+        json.dump({"shape": shape.to_json(), "environment": environment(), "results": results}, baseline_file, indent=1, sort_keys=True)
+        baseline_file.write("\n")
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    print(f"{'benchmark':<28}{'seconds':>10}{'baseline':>10}{'change':>9}")
+    for name, seconds in results.items():
+        base = baseline["results"].get(name) if baseline else None
+        if base:
+            change = seconds / base - 1
+            flag = "  REGRESSION" if change > threshold else ""
+            print(f"{name:<28}{seconds:>10.4f}{base:>10.4f}{change:>+9.1%}{flag}")
+            if flag:
+                regressions.append(name)
+        else:
+            print(f"{name:<28}{seconds:>10.4f}{'-':>10}{'-':>9}")
+    return regressions
+
+
+def parse_args(args):
+    defaults = CorpusShape()
+    parser = argparse.ArgumentParser(description="Time the generator on a synthetic site and compare against a baseline.")
+    parser.add_argument("--pages", type=int, default=defaults.pages, help="number of pages in the corpus")
+    parser.add_argument("--depth", type=int, default=defaults.depth, help="directory depth of every page")
+    parser.add_argument("--blocks", type=int, default=defaults.blocks, help="blocks per page")
+    parser.add_argument("--block-mix", type=json.loads, default=defaults.block_mix,
+                        help="JSON object of block type weights, e.g. '{\"paragraph\": 3, \"code\": 1}'")
+    parser.add_argument("--links", type=float, default=defaults.link_density, help="share of words that are links")
+    parser.add_argument("--emphasis", type=float, default=defaults.emphasis_density, help="share of words with inline markup")
+    parser.add_argument("--images", type=int, default=defaults.images, help="images per page")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--repeat", type=int, default=5, help="runs per benchmark; the best one is reported")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="slowdown over baseline reported as a regression (default: 0.25)")
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the new baseline")
+    return parser.parse_args(args)
+
+
+def main(args):
+    args = parse_args(args)
+    shape = CorpusShape(args.pages, args.depth, args.blocks, args.block_mix, args.links, args.emphasis, args.images, args.seed)
+    print(shape)
+    results = run_suite(shape, args.repeat)
+    baseline = load_baseline(args.baseline)
+    if baseline and baseline["shape"] != shape.to_json():
+        print(f"Baseline {args.baseline} was recorded for a different corpus shape; not comparing.")
+        baseline = None
+    elif baseline and baseline.get("environment") != environment():
+        print(f"Baseline {args.baseline} was recorded on another machine or Python ({baseline.get('environment')}); not comparing.")
+        baseline = None
+    regressions = compare(results, baseline, args.threshold)
+    if args.update_baseline:
+        save_baseline(args.baseline, shape, results)
+        print(f"Saved baseline to {args.baseline}")
+    elif regressions:
+        sys.exit(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,60 @@
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from walker import walk_files
+
+FILES_PER_DIR = 100
+
+
+def make_tree(root, files):
+    for index in range(files):
+        dir_path = os.path.join(root, f"d{index // (FILES_PER_DIR * FILES_PER_DIR)}", f"d{index // FILES_PER_DIR % FILES_PER_DIR}")
+        if index % FILES_PER_DIR == 0:
+            os.makedirs(dir_path, exist_ok=True)
+        with open(os.path.join(dir_path, f"page{index}.md"), "w") as md_file:
+            md_file.write("# Page\n")
+
+
+def listdir_walk(dir_path, rel_dir=""):
+    # The recursive os.listdir walk the build used before the shared walker.
+    files = []
+    for item in os.listdir(dir_path):
+        src_path = os.path.join(dir_path, item)
+        if os.path.isfile(src_path):
+            files.append((src_path, os.stat(src_path).st_size))
+        elif os.path.isdir(src_path):
+            files.extend(listdir_walk(src_path, os.path.join(rel_dir, item)))
+    return files
+
+
+def scandir_walk(root):
+    return sum(1 for entry, _ in walk_files(root) if entry.stat().st_size >= 0)
+
+
+def measure(function):
+    start = time.perf_counter()
+    result = function()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak, result
+
+
+def run(files=100000):
+    with tempfile.TemporaryDirectory() as root:
+        start = time.perf_counter()
+        make_tree(root, files)
+        print(f"Created {files} files in {time.perf_counter() - start:.1f} s.")
+        print(f"{'walker':<10}{'files':>8}{'seconds':>10}{'peak MB':>10}")
+        for name, function in [("listdir", lambda: len(listdir_walk(root))), ("scandir", lambda: scandir_walk(root))]:
+            seconds, peak, count = measure(function)
+            print(f"{name:<10}{count:>8}{seconds:>10.3f}{peak / 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    run(*[int(arg) for arg in sys.argv[1:2]])
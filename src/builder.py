@@ -0,0 +1,118 @@
+import os
+from content import PageGenerationError
+from markdown import inline_memo, blocks_to_html_node, scan_markdown, extract_title_from_blocks, split_front_matter
+from pipeline import bounded_map, process_pool
+from template import TEMPLATE_FILE_NAME, Template, TemplateCache, UrlResolver
+
+DEFAULT_TEMPLATE = "<!DOCTYPE html><html><head><title>{{ Title }}</title></head><body>{{ Content }}</body></html>"
+DEFAULT_TEMPLATE_PATH = "template.html"
+
+
+class RenderedPage:
+
+    def __init__(self, path, dest_path, title=None, html=None, error=None):
+        self.path = path
+        self.dest_path = dest_path
+        self.title = title
+        self.html = html
+        self.error = error
+
+    def __eq__(self, other):
+        return (self.path == other.path and self.dest_path == other.dest_path and self.title == other.title
+                and self.html == other.html and self.error == other.error)
+
+    def __repr__(self):
+        return f"RenderedPage({self.path}, {self.dest_path}, {self.title}, {self.error})"
+
+
+class Site:
+
+    def __init__(self, template=DEFAULT_TEMPLATE, basepath="/", templates=None, assets=None, jobs=1):
+        self.basepath = basepath
+        self.jobs = jobs
+        self.resolve_url = UrlResolver(basepath, assets)
+        templates = {os.path.normpath(path): source for path, source in templates.items()} if templates else {}
+        templates.setdefault(DEFAULT_TEMPLATE_PATH, template)
+        dir_templates = {
+            os.path.dirname(path): path for path in templates if os.path.basename(path) == TEMPLATE_FILE_NAME
+        }
+        self.templates = TemplateCache(DEFAULT_TEMPLATE_PATH, basepath, dir_templates, assets)
+        for path, source in templates.items():
+            self.templates.templates[path] = Template(source, self.resolve_url, path)
+        self.executor = None
+
+    def render(self, path, markdown):
+        front_matter, markdown = split_front_matter(markdown)
+        # Drafts come from outside the site, so they may only pick one of the templates it was built with.
+        template_path = os.path.normpath(self.templates.template_path(path, front_matter))
+        template = self.templates.templates.get(template_path)
+        if template is None:
+            raise ValueError(f"Unknown template {template_path}.")
+        blocks = scan_markdown(markdown)
+        title = extract_title_from_blocks(blocks)
+        body = blocks_to_html_node(blocks, template.resolve_url).to_html()
+        return RenderedPage(path, page_dest_path(path), title, template.render(Title=title, Content=body))
+
+    def render_many(self, sources):
+        if isinstance(sources, dict):
+            sources = sources.items()
+        if self.jobs > 1:
+            if self.executor is None:
+                self.executor = process_pool(self.jobs, init_worker, (self, inline_memo.max_entries))
+            return bounded_map(self.executor, render_in_worker, sources)
+        return map(self.try_render, sources)
+
+    def try_render(self, source):
+        path, markdown = source
+        try:
+            return self.render(path, markdown)
+        except Exception as error:
+            return RenderedPage(path, page_dest_path(path), error=f"Failed to render {path}: {error!r}")
+
+    def build(self, sources):
+        pages = {}
+        errors = []
+        for page in self.render_many(sources):
+            if page.error:
+                errors.append(page.error)
+            else:
+                pages[page.path] = page
+        if errors:
+            raise PageGenerationError(f"{len(errors)} of {len(pages) + len(errors)} pages failed to render: {'; '.join(errors)}")
+        return pages
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["executor"] = None
+        return state
+
+    def __repr__(self):
+        return f"Site({self.basepath}, {len(self.templates)} templates, jobs: {self.jobs})"
+
+
+def page_dest_path(path):
+    return path.removesuffix(".md") + ".html"
+
+
+worker_site = None
+
+
+def init_worker(site, inline_memo_size):
+    global worker_site
+    worker_site = site
+    inline_memo.resize(inline_memo_size)
+
+
+def render_in_worker(source):
+    return worker_site.try_render(source)
@@ -0,0 +1,93 @@
+import json
+import os
+from manifest import hash_bytes
+from highlight import HIGHLIGHT_VERSION
+from markdown import PARSER_VERSION
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def assets_key(references, resolve_url):
+    return resolve_url.assets_key(url for _, url in references) if resolve_url else ""
+
+
+class PageCache:
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def key(self, markdown, resolve_url=None):
+        # Fingerprinted asset names are checked per entry in get(), so a changed asset only misses the pages that use it.
+        basepath = resolve_url.basepath if resolve_url else ""
+        return hash_bytes(f"{PARSER_VERSION}\0{basepath}\0{markdown}".encode())
+
+    def entry_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def get(self, key, resolve_url=None):
+        path = self.entry_path(key)
+        try:
+            with open(path) as entry_file:
+                entry = json.load(entry_file)
+            references = [tuple(reference) for reference in entry["references"]]
+            if entry["assets"] != assets_key(references, resolve_url):
+                return None
+            os.utime(path)
+        except (OSError, ValueError, KeyError):
+            return None
+        return entry["title"], entry["body"], references
+
+    def put(self, key, title, body, references=(), resolve_url=None):
+        self.write_entry(key, {"title": title, "body": body, "references": list(references), "assets": assets_key(references, resolve_url)})
+
+    def snippet_key(self, language, code_hash):
+        return hash_bytes(f"{HIGHLIGHT_VERSION}\0{language}\0{code_hash}".encode())
+
+    def get_snippet(self, key):
+        path = self.entry_path(key)
+        try:
+            with open(path) as entry_file:
+                html = json.load(entry_file)["html"]
+            os.utime(path)
+        except (OSError, ValueError, KeyError):
+            return None
+        return html
+
+    def put_snippet(self, key, html):
+        self.write_entry(key, {"html": html})
+
+    def write_entry(self, key, entry):
+        path = self.entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as entry_file:
+            json.dump(entry, entry_file)
+        os.replace(tmp_path, path)
+
+    def evict(self):
+        entries = []
+        total = 0
+        if not os.path.isdir(self.cache_dir):
+            return 0
+        for shard in os.listdir(self.cache_dir):
+            shard_path = os.path.join(self.cache_dir, shard)
+            if not os.path.isdir(shard_path):
+                continue
+            for name in os.listdir(shard_path):
+                path = os.path.join(shard_path, name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+                total += stat.st_size
+        evicted = 0
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            evicted += 1
+        return evicted
+
+    def __repr__(self):
+        return f"PageCache({self.cache_dir}, max_bytes: {self.max_bytes})"
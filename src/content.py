@@ -1,20 +1,133 @@
 import os
+import posixpath
+import re
 import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from functools import partial
 from pathlib import Path
-from markdown import markdown_to_html_node, extract_title
+from markdown import (inline_memo, blocks_to_html_node, markdown_lines_to_html, scan_markdown, scan_title, extract_title_from_blocks,
+                      split_front_matter, split_front_matter_lines)
+from highlight import highlight_memo, use_highlight_store
+from template import TEMPLATE_FILE_NAME, TemplateCache, split_url_suffix
+from graph import load_graph
+from siteindex import load_site_index
+from profiler import NULL_PROFILE, profile_page
+from walker import walk_files
+from pipeline import READ_THREADS, PageWriter, bounded_map, process_pool, remove_empty_dirs, write_file
+from manifest import (hash_bytes, hash_file, hash_lines, load_manifest, load_asset_manifest, save_manifest,
+                      known_page_hash, is_asset_fresh, page_hash, record_page)
 
-def remove_and_replace_dir_content(from_path, dest_path):
+FINGERPRINT_LENGTH = 10
+# Files that are fetched by a well-known name keep it when assets are fingerprinted.
+UNFINGERPRINTED_ASSETS = {"robots.txt", "favicon.ico", "CNAME", ".nojekyll"}
+PAGE_PATTERNS = ["*.md", TEMPLATE_FILE_NAME]
+CSS_REFERENCE_PATTERN = re.compile(r"""url\(\s*(['"]?)([^'")]+?)\1\s*\)|@import\s+(['"])([^'"]+)\3""")
+URL_SCHEME_PATTERN = re.compile(r"^[A-Za-z][A-Za-z0-9+.-]*:")
+
+def remove_and_replace_dir_content(from_path, dest_path, exclude=None):
     clean_or_make_dir(dest_path)
-    if os.path.exists(from_path) and os.path.isdir(from_path) and os.path.exists(dest_path) and os.path.isdir(dest_path):
-        static_items = os.listdir(from_path)
-        for item in static_items:
-            src_path = os.path.join(from_path, item)
-            dst_path = os.path.join(dest_path, item)
-            if os.path.isfile(src_path):
-                shutil.copy(src_path, dst_path)
-                print(f"Copying {src_path} to {dst_path}...")
+    for entry, rel_path in walk_files(from_path, exclude=exclude):
+        dst_path = os.path.join(dest_path, rel_path)
+        os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+        shutil.copy(entry.path, dst_path)
+        print(f"Copying {entry.path} to {dst_path}...")
+
+
+def sync_dir_content(from_path, dest_path, manifest_path, use_hash=False, fingerprint=False, exclude=None, rewrite=False):
+    os.makedirs(dest_path, exist_ok=True)
+    manifest = load_asset_manifest(manifest_path)
+    assets = {}
+    src_paths = {}
+    css_references = set()
+    for entry, rel_path in walk_files(from_path, exclude=exclude):
+        src_path = entry.path
+        stat = entry.stat()
+        asset_entry = {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+        known_entry = manifest["assets"].get(rel_path)
+        is_fresh = is_asset_fresh(manifest, rel_path, asset_entry)
+        if use_hash:
+            asset_entry["hash"] = hash_file(src_path)
+        elif fingerprint:
+            if is_fresh and known_entry.get("hash"):
+                asset_entry["hash"] = known_entry["hash"]
+            else:
+                asset_entry["hash"] = hash_file(src_path)
+        if fingerprint and rel_path.endswith(".css"):
+            if is_fresh and "references" in known_entry:
+                asset_entry["references"] = known_entry["references"]
             else:
-                remove_and_replace_dir_content(src_path, dst_path)   
+                asset_entry["references"] = css_asset_references(src_path, rel_path)
+            css_references.update(asset_entry["references"])
+        assets[rel_path] = asset_entry
+        src_paths[rel_path] = src_path
+    copied = 0
+    for rel_path, asset_entry in assets.items():
+        src_path = src_paths[rel_path]
+        known_entry = manifest["assets"].get(rel_path)
+        # Stylesheets aren't rewritten, so the assets they point at keep their names.
+        if fingerprint and is_fingerprinted(rel_path) and rel_path not in css_references:
+            asset_entry["dest"] = fingerprinted_path(rel_path, asset_entry["hash"])
+        else:
+            asset_entry["dest"] = rel_path
+        dst_path = os.path.join(dest_path, asset_entry["dest"])
+        if rewrite or not (is_asset_fresh(manifest, rel_path, asset_entry) and asset_dest(known_entry, rel_path) == asset_entry["dest"]
+                           and os.path.isfile(dst_path)):
+            os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+            shutil.copy2(src_path, dst_path)
+            copied += 1
+    current_dests = set(asset_entry["dest"] for asset_entry in assets.values())
+    removed = 0
+    for rel_path, known_entry in manifest["assets"].items():
+        dst_path = os.path.join(dest_path, asset_dest(known_entry, rel_path))
+        if asset_dest(known_entry, rel_path) not in current_dests and os.path.isfile(dst_path):
+            os.remove(dst_path)
+            remove_empty_dirs(os.path.dirname(dst_path), dest_path)
+            removed += 1
+    changed = sorted(
+        rel_path for rel_path in manifest["assets"].keys() | assets.keys()
+        if rel_path not in assets or rel_path not in manifest["assets"]
+        or asset_dest(manifest["assets"][rel_path], rel_path) != assets[rel_path]["dest"]
+    )
+    manifest["assets"] = assets
+    save_manifest(manifest, manifest_path)
+    print(f"Synced {from_path} to {dest_path}: {copied} copied, {len(assets) - copied} unchanged, {removed} removed.")
+    asset_map = {
+        rel_path.replace(os.sep, "/"): asset_entry["dest"].replace(os.sep, "/")
+        for rel_path, asset_entry in assets.items() if asset_entry["dest"] != rel_path
+    }
+    return asset_map, changed
+
+
+def css_asset_references(css_path, rel_path):
+    with open(css_path) as css_file:
+        css = css_file.read()
+    references = set()
+    for match in CSS_REFERENCE_PATTERN.finditer(css):
+        url, _ = split_url_suffix(match[2] or match[4])
+        if not url or url.startswith("//") or URL_SCHEME_PATTERN.match(url):
+            continue
+        if url.startswith("/"):
+            # The basepath the site is served under isn't known here, so every trailing part of the path counts.
+            parts = url.strip("/").split("/")
+            references.update("/".join(parts[index:]) for index in range(len(parts)))
+        else:
+            references.add(posixpath.normpath(posixpath.join(posixpath.dirname(rel_path), url)))
+    return sorted(references)
+
+
+def asset_dest(asset_entry, rel_path):
+    return asset_entry.get("dest", rel_path) if asset_entry else None
+
+
+def is_fingerprinted(rel_path):
+    return os.path.basename(rel_path) not in UNFINGERPRINTED_ASSETS and not rel_path.endswith(".html")
+
+
+def fingerprinted_path(rel_path, asset_hash):
+    root, extension = os.path.splitext(rel_path)
+    return f"{root}.{asset_hash[:FINGERPRINT_LENGTH]}{extension}"
 
 
 def clean_or_make_dir(dir_path):
@@ -23,32 +136,369 @@ def clean_or_make_dir(dir_path):
     os.mkdir(dir_path)
 
 
-def generate_page(from_path, template_path, dest_path, basepath):
-    print(f"Generating page from {from_path} to {dest_path} using {template_path}...")
+STREAMING_THRESHOLD = 16 * 1024 * 1024
+
+
+class PageGenerationError(Exception):
+    pass
+
+
+class PageResult:
+
+    def __init__(self, from_path, dest_path, source_hash=None, generated=False, error=None, phases=None, stats=None, chunks=None,
+                 references=None):
+        self.from_path = from_path
+        self.dest_path = dest_path
+        self.source_hash = source_hash
+        self.generated = generated
+        self.error = error
+        self.phases = phases
+        self.stats = stats if stats else {}
+        self.chunks = chunks
+        self.references = references
+        self.markdown_hash = None
+        self.template_path = None
+        self.title = None
+
+    def __repr__(self):
+        return f"PageResult({self.from_path}, {self.dest_path}, {self.source_hash}, generated: {self.generated}, {self.error})"
+
+
+class PageSource:
+
+    def __init__(self, from_path, dest_path, known_hash=None, markdown=None, front_matter=None, read_seconds=0.0, error=None):
+        self.from_path = from_path
+        self.dest_path = dest_path
+        self.known_hash = known_hash
+        self.markdown = markdown
+        self.front_matter = front_matter if front_matter else {}
+        self.read_seconds = read_seconds
+        self.error = error
+        self.template = None
+
+    def __repr__(self):
+        return f"PageSource({self.from_path}, {self.dest_path}, {self.known_hash}, {self.front_matter}, {self.template}, {self.error})"
+
+
+def generate_page(from_path, template, dest_path, known_hash=None, profile=NULL_PROFILE, cache=None):
+    if is_large_page(from_path):
+        return generate_large_page(from_path, template, dest_path, known_hash, profile)
+    with profile.phase("read"):
+        _, markdown = split_front_matter(read_markdown(from_path))
+    result = render_page(from_path, template, dest_path, markdown, known_hash, profile, cache)
+    if result.chunks is not None:
+        with profile.phase("write"):
+            write_file(dest_path, result.chunks)
+        result.chunks = None
+    return result
+
+
+def is_large_page(from_path):
+    return os.path.isfile(from_path) and os.path.getsize(from_path) > STREAMING_THRESHOLD
+
+
+def read_markdown(from_path):
     if os.path.exists(from_path) and os.path.isfile(from_path):
         with open(from_path) as md_file:
-            markdown = md_file.read()
-    if os.path.exists(template_path) and os.path.isfile(template_path):
-        with open(template_path) as template:
-            template_content = template.read()
-    if markdown and template_content:
-        title = extract_title(markdown)
-        content = markdown_to_html_node(markdown).to_html()
-        page_content = template_content.replace("{{ Title }}", title).replace("{{ Content }}", content).replace("href=\"/", f"href=\"{basepath}").replace("src=\"/", f"src=\"{basepath}")
-        dest_path_dir = os.path.dirname(dest_path)
-        if dest_path_dir:
-            os.makedirs(dest_path_dir, exist_ok=True)
-        with open(dest_path, "w") as page_file:
-            page_file.write(page_content)
-
-
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath):
-    if os.path.exists(dir_path_content) and os.path.isdir(dir_path_content):
-        content_items = os.listdir(dir_path_content)
-        for item in content_items:
-            src_path = os.path.join(dir_path_content, item)
-            dest_path = os.path.join(dest_dir_path, item)
-            if os.path.isfile(src_path) and item.endswith(".md"):
-                generate_page(src_path, template_path, dest_path.removesuffix("md") + "html", basepath)
-            elif os.path.isdir(src_path):
-                generate_pages_recursive(src_path, template_path, dest_path, basepath)
\ No newline at end of file
+            return md_file.read()
+
+
+def read_page_title(from_path):
+    with open(from_path) as md_file:
+        return scan_title(split_front_matter_lines(md_file)[1])
+
+
+def render_page(from_path, template, dest_path, markdown, known_hash=None, profile=NULL_PROFILE, cache=None, track_references=False):
+    markdown_hash = hash_bytes(markdown.encode())
+    source_hash = page_hash(markdown_hash, template)
+    if source_hash == known_hash:
+        return PageResult(from_path, dest_path, source_hash)
+    print(f"Generating page from {from_path} to {dest_path} using {template.path}...")
+    result = PageResult(from_path, dest_path, source_hash, generated=True)
+    references = []
+    if markdown:
+        cached = None
+        if cache:
+            with profile.phase("page cache"):
+                cache_key = cache.key(markdown, template.resolve_url)
+                cached = cache.get(cache_key, template.resolve_url)
+            result.stats["page cache hits" if cached else "page cache misses"] = 1
+        if cached:
+            title, body, references = cached
+            chunks = [body]
+        else:
+            with profile.phase("tree building"):
+                blocks = scan_markdown(markdown)
+                title = extract_title_from_blocks(blocks)
+                content = blocks_to_html_node(blocks, template.resolve_url, references)
+            if cache:
+                with profile.phase("serialization"):
+                    body = content.to_html()
+                with profile.phase("page cache"):
+                    cache.put(cache_key, title, body, references, template.resolve_url)
+                chunks = [body]
+            elif profile.enabled:
+                # Serialized up front only so the profile can time it apart from the write.
+                with profile.phase("serialization"):
+                    chunks = list(content.iter_html())
+            else:
+                chunks = content.iter_html()
+        result.chunks = template.iter_render(Title=title, Content=chunks)
+        result.title = title
+    if track_references:
+        result.references = references
+        result.markdown_hash = markdown_hash
+    return result
+
+
+def generate_large_page(from_path, template, dest_path, known_hash=None, profile=NULL_PROFILE, track_references=False):
+    with profile.phase("read"):
+        with open(from_path) as md_file:
+            markdown_hash = hash_lines(split_front_matter_lines(md_file)[1])
+        source_hash = page_hash(markdown_hash, template)
+    if source_hash == known_hash:
+        return PageResult(from_path, dest_path, source_hash)
+    print(f"Streaming page from {from_path} to {dest_path} using {template.path}...")
+    title = read_page_title(from_path)
+    references = []
+    with profile.phase("write"):
+        with open(from_path) as md_file:
+            content = markdown_lines_to_html(split_front_matter_lines(md_file)[1], template.resolve_url, references)
+            write_file(dest_path, template.iter_render(Title=title, Content=content))
+    result = PageResult(from_path, dest_path, source_hash, generated=True)
+    result.title = title
+    if track_references:
+        result.references = references
+        result.markdown_hash = markdown_hash
+    return result
+
+
+def read_page_source(source):
+    start = time.perf_counter()
+    try:
+        if is_large_page(source.from_path):
+            with open(source.from_path) as md_file:
+                source.front_matter = split_front_matter_lines(md_file)[0]
+        else:
+            source.front_matter, source.markdown = split_front_matter(read_markdown(source.from_path))
+    except Exception as error:
+        source.error = f"Failed to read page source {source.from_path}: {error!r}"
+    source.read_seconds = time.perf_counter() - start
+    return source
+
+
+def select_page_template(templates, source):
+    if not source.error:
+        try:
+            source.template = templates.select(source.from_path, source.front_matter)
+        except Exception as error:
+            source.error = f"Failed to load template for {source.from_path}: {error!r}"
+    return source
+
+
+def render_page_job(profiling, cache, track_references, in_worker, source):
+    from_path, dest_path, known_hash, markdown, template = source.from_path, source.dest_path, source.known_hash, source.markdown, source.template
+    if source.error:
+        return PageResult(from_path, dest_path, error=source.error)
+    hits, misses = inline_memo.counters()
+    highlight_hits, highlight_misses = highlight_memo.counters()
+    try:
+        if profiling:
+            with profile_page() as profile:
+                if markdown is None:
+                    result = generate_large_page(from_path, template, dest_path, known_hash, profile, track_references)
+                else:
+                    result = render_page(from_path, template, dest_path, markdown, known_hash, profile, cache, track_references)
+            profile.add("read", source.read_seconds)
+            result.phases = profile.export()
+        elif markdown is None:
+            result = generate_large_page(from_path, template, dest_path, known_hash, track_references=track_references)
+        else:
+            result = render_page(from_path, template, dest_path, markdown, known_hash, cache=cache, track_references=track_references)
+    except Exception as error:
+        return PageResult(from_path, dest_path, error=f"Failed to generate page from {from_path}: {error!r}")
+    if in_worker and result.chunks is not None:
+        # Generators can't be pickled, so pages rendered in a worker process are sent back as a list of chunks.
+        result.chunks = list(result.chunks)
+    result.template_path = template.path
+    result.stats["inline memo hits"] = inline_memo.hits - hits
+    result.stats["inline memo misses"] = inline_memo.misses - misses
+    result.stats["highlight memo hits"] = highlight_memo.hits - highlight_hits
+    result.stats["highlight memo misses"] = highlight_memo.misses - highlight_misses
+    return result
+
+
+def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath, manifest_path=None, jobs=1, profile=NULL_PROFILE, cache=None,
+                             graph_path=None, static_dir="static", index_path=None, site_url="", assets=None, changed_assets=None,
+                             exclude=None, rewrite=False):
+    dir_templates = {}
+    with profile.phase("directory walk"):
+        pages = find_pages(dir_path_content, dest_dir_path, dir_templates, exclude)
+    templates = TemplateCache(template_path, basepath, dir_templates, assets)
+    manifest = None
+    if manifest_path:
+        manifest = load_manifest(manifest_path, basepath)
+        if rewrite:
+            for entry in manifest["pages"].values():
+                entry["hash"] = None
+    graph = None
+    if graph_path:
+        graph = load_graph(graph_path, dir_path_content, static_dir)
+        graph.use_pages(set(os.path.normpath(from_path) for from_path, _ in pages))
+        if manifest is not None:
+            for from_path, _ in pages:
+                if os.path.normpath(from_path) not in graph.pages and from_path in manifest["pages"]:
+                    manifest["pages"][from_path]["hash"] = None
+    if changed_assets and manifest is not None:
+        invalidate_asset_dependents(manifest, graph, changed_assets, static_dir)
+    site_index = None
+    if index_path:
+        site_index = load_site_index(index_path, dest_dir_path, site_url)
+    generated, errors, stats = render_pages(pages, templates, manifest, jobs, profile, cache, graph, site_index)
+    if stats.get("inline memo hits") or stats.get("inline memo misses"):
+        print(f"Inline memo: {stats['inline memo hits']} hits, {stats['inline memo misses']} misses.")
+    if stats.get("highlight memo hits") or stats.get("highlight memo misses"):
+        print(f"Highlight memo: {stats['highlight memo hits']} hits, {stats['highlight memo misses']} misses.")
+    if cache:
+        evicted = cache.evict()
+        print(f"Page cache: {stats.get('page cache hits', 0)} hits, {stats.get('page cache misses', 0)} misses, {evicted} evicted.")
+    if manifest is not None:
+        current_sources = set(from_path for from_path, _ in pages)
+        removed = remove_pages(manifest, [from_path for from_path in manifest["pages"] if from_path not in current_sources], dest_dir_path)
+        save_manifest(manifest, manifest_path)
+        if graph is not None:
+            graph_sources = set(os.path.normpath(from_path) for from_path in current_sources)
+            for from_path in [from_path for from_path in graph.pages if from_path not in graph_sources]:
+                graph.remove(from_path)
+            graph.save(graph_path)
+        print(f"Generated {generated} pages, skipped {len(pages) - generated - len(errors)} unchanged, removed {removed} stale.")
+    if site_index is not None:
+        update_site_index(site_index, pages, templates, dir_path_content, rewrite)
+        site_index.save(index_path)
+    if errors:
+        for error in errors:
+            print(error)
+        raise PageGenerationError(f"{len(errors)} of {len(pages)} pages failed to generate.")
+
+
+def invalidate_asset_dependents(manifest, graph, changed_assets, static_dir):
+    # A renamed asset changes the URLs rendered into the pages that reference it. Without
+    # a graph there is no way to tell which pages those are, so all of them are rebuilt.
+    if graph is None:
+        from_paths = manifest["pages"].keys()
+    else:
+        from_paths = set(
+            from_path
+            for rel_path in changed_assets
+            for from_path, _ in graph.dependents(os.path.join(static_dir, rel_path), ("assets",))
+        )
+    for from_path in from_paths:
+        if from_path in manifest["pages"]:
+            manifest["pages"][from_path]["hash"] = None
+
+
+def update_site_index(site_index, pages, templates, dir_path_content, rewrite=False):
+    current_sources = set(from_path for from_path, _ in pages)
+    for from_path in [from_path for from_path in site_index.pages if from_path not in current_sources]:
+        site_index.remove(from_path)
+    for from_path, dest_path in pages:
+        if from_path not in site_index.pages and os.path.isfile(dest_path):
+            try:
+                site_index.record(from_path, dest_path, read_page_title(from_path))
+            except Exception:
+                continue
+    written, removed = site_index.write(templates, dir_path_content, rewrite)
+    if written or removed:
+        print(f"Site index: {len(site_index.pages)} pages, {written} index files written, {removed} removed.")
+
+
+def init_render_worker(inline_memo_size, cache):
+    inline_memo.resize(inline_memo_size)
+    use_highlight_store(cache)
+
+
+def render_pages(pages, templates, manifest=None, jobs=1, profile=NULL_PROFILE, cache=None, graph=None, site_index=None):
+    page_sources = [
+        PageSource(from_path, dest_path, known_page_hash(manifest, from_path, dest_path) if manifest else None)
+        for from_path, dest_path in pages
+    ]
+    generated = 0
+    errors = []
+    stats = {}
+    writer = PageWriter()
+    with ExitStack() as stack:
+        if cache is not None:
+            use_highlight_store(cache)
+            stack.callback(use_highlight_store, None)
+        readers = stack.enter_context(ThreadPoolExecutor(max_workers=READ_THREADS))
+        sources = map(partial(select_page_template, templates), bounded_map(readers, read_page_source, page_sources))
+        if jobs > 1 and len(page_sources) > 1:
+            renderers = stack.enter_context(process_pool(jobs, init_render_worker, (inline_memo.max_entries, cache)))
+            results = bounded_map(renderers, partial(render_page_job, profile.enabled, cache, graph is not None, True), sources)
+        else:
+            results = map(partial(render_page_job, profile.enabled, cache, graph is not None, False), sources)
+        try:
+            for result in results:
+                if result.error:
+                    errors.append(result.error)
+                    continue
+                if result.chunks is not None:
+                    writer.put(result.from_path, result.dest_path, result.chunks)
+                    result.chunks = None
+                for name, count in result.stats.items():
+                    stats[name] = stats.get(name, 0) + count
+                if result.generated:
+                    generated += 1
+                    if result.phases:
+                        profile.add_page(result.from_path, result.phases)
+                elif result.phases:
+                    profile.merge(result.phases)
+                if manifest is not None:
+                    record_page(manifest, result.from_path, result.source_hash, result.dest_path)
+                if graph is not None and result.references is not None:
+                    graph.record(result.from_path, result.template_path, result.references, result.markdown_hash)
+                if site_index is not None and result.title is not None:
+                    site_index.record(result.from_path, result.dest_path, result.title)
+        finally:
+            writer.close()
+    if writer.written:
+        profile.add("write", writer.seconds, writer.written)
+    for from_path, error in writer.errors:
+        errors.append(error)
+        generated -= 1
+        if manifest is not None:
+            manifest["pages"].pop(from_path, None)
+        if graph is not None:
+            graph.remove(from_path)
+        if site_index is not None:
+            site_index.remove(from_path)
+    return generated, errors, stats
+
+
+def page_dest_path(from_path, dir_path_content, dest_dir_path):
+    return os.path.join(dest_dir_path, os.path.relpath(from_path, dir_path_content)).removesuffix("md") + "html"
+
+
+def find_pages(dir_path_content, dest_dir_path, dir_templates=None, exclude=None):
+    pages = []
+    for entry, rel_path in walk_files(dir_path_content, PAGE_PATTERNS, exclude):
+        if entry.name == TEMPLATE_FILE_NAME:
+            if dir_templates is not None:
+                dir_templates[os.path.dirname(entry.path)] = entry.path
+        else:
+            pages.append((entry.path, os.path.join(dest_dir_path, rel_path).removesuffix("md") + "html"))
+    return pages
+
+
+def remove_pages(manifest, from_paths, dest_dir_path):
+    removed = 0
+    for from_path in from_paths:
+        if from_path not in manifest["pages"]:
+            continue
+        dest_path = manifest["pages"].pop(from_path)["dest"]
+        if os.path.isfile(dest_path):
+            print(f"Removing {dest_path} (source {from_path} was deleted)...")
+            os.remove(dest_path)
+            remove_empty_dirs(os.path.dirname(dest_path), dest_dir_path)
+            removed += 1
+    return removed
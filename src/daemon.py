@@ -0,0 +1,162 @@
+import json
+import os
+import socket
+import socketserver
+import stat
+import struct
+import threading
+
+HEADER = struct.Struct("!I")
+MAX_MESSAGE_SIZE = 64 * 1024 * 1024
+DEFAULT_SOCKET_PATH = ".build/render.sock"
+
+
+class ProtocolError(Exception):
+    pass
+
+
+class SocketInUseError(Exception):
+    pass
+
+
+def send_message(sock, message):
+    data = json.dumps(message).encode()
+    sock.sendall(HEADER.pack(len(data)) + data)
+
+
+def receive_exactly(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def receive_message(sock):
+    header = receive_exactly(sock, HEADER.size)
+    if header is None:
+        return None
+    (size,) = HEADER.unpack(header)
+    if size > MAX_MESSAGE_SIZE:
+        raise ProtocolError(f"Message of {size} bytes exceeds the {MAX_MESSAGE_SIZE} byte limit.")
+    data = receive_exactly(sock, size)
+    if data is None:
+        raise ProtocolError("Connection closed in the middle of a message.")
+    return json.loads(data)
+
+
+def handle_request(site, request):
+    if request.get("op") == "ping":
+        return {"ok": True}
+    if request.get("op") == "render":
+        page = site.try_render((request.get("path", "index.md"), request["markdown"]))
+        if page.error:
+            return {"ok": False, "error": page.error}
+        return {"ok": True, "path": page.path, "dest": page.dest_path, "title": page.title, "html": page.html}
+    return {"ok": False, "error": f"Unknown op {request.get('op')!r}"}
+
+
+class RenderHandler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        while True:
+            try:
+                request = receive_message(self.request)
+            except (ProtocolError, ValueError) as error:
+                send_message(self.request, {"ok": False, "error": str(error)})
+                return
+            if request is None:
+                return
+            try:
+                response = handle_request(self.server.site, request)
+            except Exception as error:
+                response = {"ok": False, "error": f"Failed to handle request: {error!r}"}
+            send_message(self.request, response)
+
+
+class RenderDaemon(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, site):
+        self.site = site
+        self.owns_socket = False
+        socket_dir = os.path.dirname(socket_path)
+        if socket_dir:
+            os.makedirs(socket_dir, exist_ok=True)
+        remove_stale_socket(socket_path)
+        super().__init__(socket_path, RenderHandler)
+
+    def server_bind(self):
+        super().server_bind()
+        self.owns_socket = True
+
+    def server_close(self):
+        super().server_close()
+        if self.owns_socket and os.path.exists(self.server_address):
+            os.remove(self.server_address)
+
+    def __repr__(self):
+        return f"RenderDaemon({self.server_address}, {self.site})"
+
+
+def remove_stale_socket(socket_path):
+    # Only the socket of a daemon that is gone is replaced, anything else at the path is left alone.
+    try:
+        mode = os.stat(socket_path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise SocketInUseError(f"{socket_path} exists and is not a socket, refusing to replace it.")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except ConnectionRefusedError:
+            os.remove(socket_path)
+            return
+    raise SocketInUseError(f"A render daemon is already listening on {socket_path}.")
+
+
+def start_daemon(socket_path, site):
+    daemon = RenderDaemon(socket_path, site)
+    threading.Thread(target=daemon.serve_forever, daemon=True).start()
+    return daemon
+
+
+class RenderClient:
+
+    def __init__(self, socket_path=DEFAULT_SOCKET_PATH, timeout=30):
+        self.socket_path = socket_path
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(socket_path)
+
+    def request(self, request):
+        send_message(self.sock, request)
+        response = receive_message(self.sock)
+        if response is None:
+            raise ProtocolError("Render daemon closed the connection.")
+        return response
+
+    def ping(self):
+        return self.request({"op": "ping"})["ok"]
+
+    def render(self, markdown, path="index.md"):
+        response = self.request({"op": "render", "path": path, "markdown": markdown})
+        if not response["ok"]:
+            raise RuntimeError(response["error"])
+        return response["html"]
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        return f"RenderClient({self.socket_path})"
@@ -0,0 +1,124 @@
+import json
+import os
+from urllib.parse import unquote, urlsplit
+from manifest import save_manifest
+
+GRAPH_VERSION = 1
+EDGE_KINDS = ("template", "assets", "pages")
+# A rendered page only embeds its own source and the template, so those are the only
+# edges that force a re-render. Asset and page links are kept for dependency queries.
+REBUILD_EDGES = ("template",)
+
+
+def resolve_reference(kind, url, from_path, content_dir, static_dir, page_paths=None):
+    parts = urlsplit(url)
+    if parts.scheme or parts.netloc or not parts.path:
+        return None
+    path = unquote(parts.path)
+    if path.startswith("/"):
+        rel_path = path.lstrip("/")
+    else:
+        rel_path = os.path.join(os.path.dirname(os.path.relpath(from_path, content_dir)), path)
+    is_dir = rel_path == "" or rel_path.endswith("/")
+    rel_path = os.path.normpath(rel_path) if rel_path else "."
+    if rel_path == ".." or rel_path.startswith(".." + os.sep):
+        return None
+    extension = os.path.splitext(rel_path)[1]
+    if kind == "image" or (extension and extension != ".html"):
+        return "assets", os.path.normpath(os.path.join(static_dir, rel_path))
+    if extension == ".html":
+        return "pages", os.path.normpath(os.path.join(content_dir, rel_path.removesuffix(".html") + ".md"))
+    if not is_dir:
+        page_path = os.path.normpath(os.path.join(content_dir, rel_path + ".md"))
+        if page_path in page_paths if page_paths is not None else os.path.isfile(page_path):
+            return "pages", page_path
+    return "pages", os.path.normpath(os.path.join(content_dir, rel_path, "index.md"))
+
+
+class BuildGraph:
+
+    def __init__(self, content_dir, static_dir, pages=None):
+        self.content_dir = content_dir
+        self.static_dir = static_dir
+        self.pages = pages if pages else {}
+        self.page_paths = None
+        self.resolved = {}
+
+    def use_pages(self, page_paths):
+        # With every page of the build known, links resolve without a stat per link and each
+        # root-relative link, or relative link per directory, only needs resolving once.
+        self.page_paths = page_paths
+        self.resolved = {}
+
+    def record(self, from_path, template_path, references, markdown_hash=None):
+        from_path = os.path.normpath(from_path)
+        known = self.pages.get(from_path)
+        if markdown_hash and known and known.get("markdown") == markdown_hash:
+            # Only the template can have changed, the links of an unchanged source resolve the same way.
+            known["template"] = [os.path.normpath(template_path)]
+            return
+        edges = {"template": [os.path.normpath(template_path)], "assets": set(), "pages": set()}
+        for kind, url in references:
+            if self.page_paths is None:
+                target = resolve_reference(kind, url, from_path, self.content_dir, self.static_dir)
+            else:
+                key = (kind, url) if url.startswith("/") else (kind, url, os.path.dirname(from_path))
+                target = self.resolved.get(key, False)
+                if target is False:
+                    target = resolve_reference(kind, url, from_path, self.content_dir, self.static_dir, self.page_paths)
+                    self.resolved[key] = target
+            if target and target[1] != from_path:
+                edges[target[0]].add(target[1])
+        self.pages[from_path] = {kind: sorted(targets) for kind, targets in edges.items()}
+        if markdown_hash:
+            self.pages[from_path]["markdown"] = markdown_hash
+
+    def remove(self, from_path):
+        self.pages.pop(os.path.normpath(from_path), None)
+
+    def dependents(self, path, kinds=EDGE_KINDS):
+        path = os.path.normpath(path)
+        return sorted(
+            (from_path, kind)
+            for from_path, edges in self.pages.items()
+            for kind in kinds
+            if path in edges.get(kind, ())
+        )
+
+    def is_page_source(self, path):
+        return path in self.pages or (path.startswith(self.content_dir + os.sep) and path.endswith(".md"))
+
+    def rebuild_set(self, paths):
+        pages = set()
+        for path in paths:
+            path = os.path.normpath(path)
+            if self.is_page_source(path):
+                pages.add(path)
+            pages.update(from_path for from_path, _ in self.dependents(path, REBUILD_EDGES))
+        return sorted(pages)
+
+    def to_json(self):
+        return {"version": GRAPH_VERSION, "content": self.content_dir, "static": self.static_dir, "pages": self.pages}
+
+    def save(self, graph_path):
+        save_manifest(self.to_json(), graph_path)
+
+    def __eq__(self, other):
+        return self.to_json() == other.to_json()
+
+    def __repr__(self):
+        return f"BuildGraph({self.content_dir}, {self.static_dir}, {len(self.pages)} pages)"
+
+
+def load_graph(graph_path, content_dir, static_dir):
+    graph = None
+    if os.path.exists(graph_path) and os.path.isfile(graph_path):
+        try:
+            with open(graph_path) as graph_file:
+                graph = json.load(graph_file)
+        except (OSError, ValueError):
+            graph = None
+    if (not graph or graph.get("version") != GRAPH_VERSION
+            or graph.get("content") != content_dir or graph.get("static") != static_dir):
+        return BuildGraph(content_dir, static_dir)
+    return BuildGraph(content_dir, static_dir, graph["pages"])
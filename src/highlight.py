@@ -0,0 +1,194 @@
+import re
+from html import escape
+from manifest import hash_bytes
+from memo import LruMemo
+
+HIGHLIGHT_MAX_LENGTH = 256 * 1024
+
+HIGHLIGHT_VERSION = "1"
+
+highlight_memo = LruMemo(max_entries=1024, max_key_length=HIGHLIGHT_MAX_LENGTH)
+# Set to the page cache during a build, so snippets highlighted by an earlier build are read back from disk.
+highlight_store = None
+
+DOUBLE_QUOTED = r'"(?:[^"\\\n]|\\.)*"'
+SINGLE_QUOTED = r"'(?:[^'\\\n]|\\.)*'"
+NUMBER = r"\b(?:0[xX][0-9a-fA-F_]+|0[bB][01_]+|0[oO][0-7_]+|\d[\d_]*\.?\d*(?:[eE][+-]?\d+)?)\b"
+C_COMMENT = r"//[^\n]*|/\*[\s\S]*?\*/"
+
+
+class Lexer:
+
+    def __init__(self, name, rules, keywords=(), builtins=(), ignore_case=False):
+        self.name = name
+        # Every rule gets its own group, so the token kind is looked up from the group that matched.
+        self.kinds = {f"t{index}": kind for index, (kind, _) in enumerate(rules)}
+        self.pattern = re.compile("|".join(f"(?P<t{index}>{pattern})" for index, (_, pattern) in enumerate(rules)),
+                                  re.IGNORECASE if ignore_case else 0)
+        self.keywords = frozenset(word.lower() for word in keywords) if ignore_case else frozenset(keywords)
+        self.builtins = frozenset(builtins)
+        self.ignore_case = ignore_case
+
+    def name_kind(self, text):
+        word = text.lower() if self.ignore_case else text
+        if word in self.keywords:
+            return "keyword"
+        if word in self.builtins:
+            return "builtin"
+        return None
+
+    def tokens(self, code):
+        # Plain text runs from the end of the last classed token, names that aren't keywords included.
+        position = 0
+        for match in self.pattern.finditer(code):
+            kind = self.kinds[match.lastgroup]
+            if kind == "name":
+                kind = self.name_kind(match.group())
+                if kind is None:
+                    continue
+            if match.start() > position:
+                yield None, code[position:match.start()]
+            yield kind, match.group()
+            position = match.end()
+        if position < len(code):
+            yield None, code[position:]
+
+    def __repr__(self):
+        return f"Lexer({self.name}, {len(self.kinds)} rules)"
+
+
+PYTHON = Lexer(
+    "python",
+    [
+        ("comment", r"#[^\n]*"),
+        ("string", r"(?:\b[rRbBuUfF]{1,2})?(?:\"\"\"[\s\S]*?\"\"\"|'''[\s\S]*?'''|" + DOUBLE_QUOTED + "|" + SINGLE_QUOTED + ")"),
+        ("decorator", r"(?<![\w)\]])@[\w.]+"),
+        ("number", NUMBER),
+        ("name", r"\b[A-Za-z_]\w*\b"),
+    ],
+    keywords=["False", "None", "True", "and", "as", "assert", "async", "await", "break", "case", "class", "continue",
+              "def", "del", "elif", "else", "except", "finally", "for", "from", "global", "if", "import", "in", "is",
+              "lambda", "match", "nonlocal", "not", "or", "pass", "raise", "return", "try", "while", "with", "yield"],
+    builtins=["abs", "all", "any", "bool", "bytes", "dict", "enumerate", "filter", "float", "int", "isinstance", "len",
+              "list", "map", "max", "min", "object", "open", "print", "range", "repr", "self", "set", "sorted", "str",
+              "sum", "super", "tuple", "type", "zip"],
+)
+
+JAVASCRIPT = Lexer(
+    "javascript",
+    [
+        ("comment", C_COMMENT),
+        ("string", DOUBLE_QUOTED + "|" + SINGLE_QUOTED + r"|`(?:[^`\\]|\\.)*`"),
+        ("number", NUMBER),
+        ("name", r"\b[A-Za-z_$][\w$]*\b"),
+    ],
+    keywords=["async", "await", "break", "case", "catch", "class", "const", "continue", "default", "delete", "do",
+              "else", "export", "extends", "false", "finally", "for", "from", "function", "if", "import", "in",
+              "instanceof", "interface", "let", "new", "null", "of", "return", "static", "switch", "this", "throw",
+              "true", "try", "type", "typeof", "undefined", "var", "void", "while", "yield"],
+    builtins=["Array", "JSON", "Map", "Math", "Object", "Promise", "Set", "String", "console", "document", "window"],
+)
+
+JSON = Lexer(
+    "json",
+    [
+        ("attribute", DOUBLE_QUOTED + r"(?=\s*:)"),
+        ("string", DOUBLE_QUOTED),
+        ("number", r"-?\b\d+(?:\.\d+)?(?:[eE][+-]?\d+)?\b"),
+        ("name", r"\b(?:true|false|null)\b"),
+    ],
+    keywords=["true", "false", "null"],
+)
+
+BASH = Lexer(
+    "bash",
+    [
+        ("comment", r"(?<![\w$])#[^\n]*"),
+        ("string", DOUBLE_QUOTED + "|'[^']*'"),
+        ("variable", r"\$(?:\{[^}\n]*\}|\w+|[@#?$!*-])"),
+        ("name", r"\b[A-Za-z_][\w-]*\b"),
+    ],
+    keywords=["case", "do", "done", "elif", "else", "esac", "export", "fi", "for", "function", "if", "in", "local",
+              "return", "then", "until", "while"],
+    builtins=["cd", "echo", "exit", "printf", "read", "set", "source", "test", "unset"],
+)
+
+HTML = Lexer(
+    "html",
+    [
+        ("comment", r"<!--[\s\S]*?-->"),
+        ("tag", r"</?[A-Za-z][\w:-]*|/?>"),
+        ("attribute", r"\b[A-Za-z_:][\w:.-]*(?==)"),
+        ("string", DOUBLE_QUOTED.replace(r"\n", "") + "|" + SINGLE_QUOTED.replace(r"\n", "")),
+    ],
+)
+
+CSS = Lexer(
+    "css",
+    [
+        ("comment", r"/\*[\s\S]*?\*/"),
+        ("string", DOUBLE_QUOTED + "|" + SINGLE_QUOTED),
+        ("keyword", r"@[\w-]+|!important"),
+        ("attribute", r"[\w-]+(?=\s*:[^{};]*;)"),
+        ("number", r"#[0-9a-fA-F]{3,8}\b|-?\b\d+(?:\.\d+)?(?:%|[a-z]+)?"),
+    ],
+)
+
+SQL = Lexer(
+    "sql",
+    [
+        ("comment", r"--[^\n]*|/\*[\s\S]*?\*/"),
+        ("string", r"'(?:[^']|'')*'"),
+        ("number", NUMBER),
+        ("name", r"\b[A-Za-z_]\w*\b"),
+    ],
+    keywords=["all", "and", "as", "asc", "by", "create", "delete", "desc", "distinct", "drop", "from", "group",
+              "having", "in", "index", "insert", "into", "is", "join", "left", "like", "limit", "not", "null", "on",
+              "or", "order", "primary", "key", "select", "set", "table", "union", "update", "values", "where", "with"],
+    builtins=["avg", "count", "max", "min", "sum"],
+    ignore_case=True,
+)
+
+LEXERS = {
+    "python": PYTHON, "py": PYTHON,
+    "javascript": JAVASCRIPT, "js": JAVASCRIPT, "typescript": JAVASCRIPT, "ts": JAVASCRIPT,
+    "json": JSON,
+    "bash": BASH, "sh": BASH, "shell": BASH, "console": BASH,
+    "html": HTML, "xml": HTML, "svg": HTML,
+    "css": CSS,
+    "sql": SQL,
+}
+
+
+def highlight_tokens(lexer, code):
+    spans = []
+    for kind, text in lexer.tokens(code):
+        text = escape(text, quote=False)
+        spans.append(f'<span class="hl-{kind}">{text}</span>' if kind else text)
+    return "".join(spans)
+
+
+def use_highlight_store(store):
+    global highlight_store
+    highlight_store = store
+
+
+def highlight_stored(lexer, code, code_hash):
+    store = highlight_store
+    if store is None:
+        return highlight_tokens(lexer, code)
+    key = store.snippet_key(lexer.name, code_hash)
+    html = store.get_snippet(key)
+    if html is None:
+        html = highlight_tokens(lexer, code)
+        store.put_snippet(key, html)
+    return html
+
+
+def highlight(language, code):
+    lexer = LEXERS.get(language)
+    if lexer is None:
+        return None
+    # The memo holds the highlighted HTML, the key only a hash of the code, which also names the snippet on disk.
+    code_hash = hash_bytes(code.encode())
+    return highlight_memo.lookup(code, (lexer.name, code_hash), lambda: highlight_stored(lexer, code, code_hash))
@@ -1,15 +1,23 @@
+import sys
 from functools import reduce
 
 class HTMLNode:
+    __slots__ = ("tag", "value", "children", "props")
 
     def __init__(self, tag=None, value=None, children=None, props=None):
-        self.tag = tag
+        self.tag = sys.intern(tag) if tag else tag
         self.value = value
         self.children = children
         self.props = props
 
-    def to_html(self):
+    def iter_html(self):
         raise NotImplementedError
+
+    def to_html(self):
+        return "".join(self.iter_html())
+
+    def write_html(self, file):
+        file.writelines(self.iter_html())
     
     def props_to_html(self):
         props = ""
@@ -22,6 +30,7 @@ class HTMLNode:
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
 
     def __init__(self, tag, value, props=None):
         super().__init__(tag, value, None, props)
@@ -32,23 +41,32 @@ class LeafNode(HTMLNode):
         open_tag = f"<{self.tag}{self.props_to_html()}>" if self.tag not in (None, "") else ""
         close_tag = f"</{self.tag}>" if self.tag not in (None, "") else ""
         return f"{open_tag}{self.value}{close_tag}"
+
+    def iter_html(self):
+        yield self.to_html()
     
     def __repr__(self):
         return f"LeafNode({self.tag}, {self.value}, {self.props})"
     
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
 
     def __init__(self, tag, children, props=None):
         super().__init__(tag, None, children, props)
 
-    def to_html(self):
+    def iter_html(self):
         if None == self.tag:
             raise ValueError("Parent node has no tag. All parent nodes must have a tag!")
         if None == self.children:
             raise ValueError("Parent node has no children. All parent nodes must have children!")
-        inner_html = reduce(lambda acummulator, child: acummulator + child.to_html(), self.children, "")
-        return f"<{self.tag}>{inner_html}</{self.tag}>"
+        yield f"<{self.tag}>"
+        for child in self.children:
+            if isinstance(child, LeafNode):
+                yield child.to_html()
+            else:
+                yield from child.iter_html()
+        yield f"</{self.tag}>"
     
     def __repr__(self):
         return f"ParentNode({self.tag}, children: {self.children}, {self.props})"
\ No newline at end of file
@@ -1,9 +1,141 @@
-from content import remove_and_replace_dir_content, generate_pages_recursive
-from sys import argv
+import argparse
+import sys
+from content import sync_dir_content, generate_pages_recursive, PageGenerationError
+from cache import PageCache
+from graph import load_graph
+from builder import Site
+from daemon import DEFAULT_SOCKET_PATH, RenderDaemon, SocketInUseError
+from markdown import inline_memo
+from output import optimize_output, was_minified
+from pipeline import READ_THREADS
+from profiler import BuildProfile, NULL_PROFILE
+from serve import SiteWatcher, serve_site
+
+MANIFEST_PATH = ".build/manifest.json"
+ASSET_MANIFEST_PATH = ".build/assets.json"
+PROFILE_PATH = ".build/profile.json"
+PAGE_CACHE_DIR = ".build/page-cache"
+GRAPH_PATH = ".build/graph.json"
+INDEX_PATH = ".build/index.json"
+OUTPUT_MANIFEST_PATH = ".build/output.json"
+
+def parse_args(args):
+    parser = argparse.ArgumentParser(description="Generate the site from content/ and static/ into docs/.")
+    parser.add_argument("basepath", nargs="?", default="/", help="URL prefix the site is served under (default: /)")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="number of worker processes used to render pages")
+    parser.add_argument("--cache-dir", default=PAGE_CACHE_DIR, help=f"directory of cached page bodies, e.g. restored by CI (default: {PAGE_CACHE_DIR})")
+    parser.add_argument("--cache-size", type=int, default=512, help="page cache size limit in MB; least recently used entries are evicted (default: 512)")
+    parser.add_argument("--no-cache", action="store_true", help="parse every page instead of using the page cache")
+    parser.add_argument("--inline-memo-size", type=int, default=inline_memo.max_entries,
+                        help=f"inline fragments kept in the per-process rendering memo, 0 disables it (default: {inline_memo.max_entries})")
+    parser.add_argument("--fingerprint-assets", action="store_true",
+                        help="copy static files as name.<hash>.ext and rewrite page and template references to them")
+    parser.add_argument("--exclude", action="append", default=[], metavar="GLOB",
+                        help="skip matching files and directories in content/ and static/, e.g. 'drafts' or '*.tmp' (repeatable)")
+    parser.add_argument("--site-url", default="", help="absolute site URL, e.g. https://example.com; sitemap.xml and feed.xml are only written once it is given")
+    parser.add_argument("--minify", action="store_true", help="strip insignificant whitespace and comments from written HTML and CSS")
+    parser.add_argument("--precompress", action="store_true",
+                        help="write a gzip .gz sidecar next to each changed text file for servers that serve precompressed files")
+    parser.add_argument("--profile", action="store_true", help="print per-phase timings and the slowest pages")
+    parser.add_argument("--profile-top", type=int, default=10, help="number of slowest pages to report (default: 10)")
+    parser.add_argument("--profile-output", default=PROFILE_PATH, help=f"where to write the JSON profile (default: {PROFILE_PATH})")
+    return parser.parse_args(args)
+
+
+def parse_serve_args(args):
+    parser = argparse.ArgumentParser(prog="main.py serve", description="Build the site and serve docs/ over HTTP.")
+    parser.add_argument("basepath", nargs="?", default="/", help="URL prefix the site is served under (default: /)")
+    parser.add_argument("--port", type=int, default=8888, help="port to listen on (default: 8888)")
+    parser.add_argument("--watch", action="store_true", help="rebuild changed pages and assets while serving")
+    parser.add_argument("--interval", type=float, default=0.25, help="seconds between change scans (default: 0.25)")
+    return parser.parse_args(args)
+
+
+def parse_depends_args(args):
+    parser = argparse.ArgumentParser(prog="main.py depends", description="List the pages that depend on a template, asset or page.")
+    parser.add_argument("paths", nargs="+", help="files to look up, e.g. template.html or static/images/tolkien.png")
+    parser.add_argument("--rebuild", action="store_true", help="only list the pages a change to the files would re-render")
+    return parser.parse_args(args)
+
+
+def depends(args):
+    args = parse_depends_args(args)
+    graph = load_graph(GRAPH_PATH, "content", "static")
+    if not graph.pages:
+        sys.exit(f"No dependency graph at {GRAPH_PATH}, build the site first.")
+    if args.rebuild:
+        for from_path in graph.rebuild_set(args.paths):
+            print(from_path)
+        return
+    for path in args.paths:
+        dependents = graph.dependents(path)
+        print(f"{path}:" if dependents else f"{path}: no dependents")
+        for from_path, kind in dependents:
+            print(f"  {from_path} ({kind})")
+
+
+def parse_daemon_args(args):
+    parser = argparse.ArgumentParser(prog="main.py daemon", description="Keep templates and caches warm and render markdown sent over a Unix socket.")
+    parser.add_argument("basepath", nargs="?", default="/", help="URL prefix the site is served under (default: /)")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help=f"Unix socket to listen on (default: {DEFAULT_SOCKET_PATH})")
+    return parser.parse_args(args)
+
+
+def daemon(args):
+    args = parse_daemon_args(args)
+    with open("template.html") as template_file:
+        site = Site(template_file.read(), args.basepath)
+    try:
+        render_daemon = RenderDaemon(args.socket, site)
+    except SocketInUseError as error:
+        sys.exit(str(error))
+    print(f"Rendering requests on {args.socket}...")
+    try:
+        render_daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        render_daemon.server_close()
+
+
+def serve(args):
+    args = parse_serve_args(args)
+    watcher = SiteWatcher("static", "content", "template.html", "docs", args.basepath, MANIFEST_PATH, ASSET_MANIFEST_PATH, GRAPH_PATH)
+    serve_site(watcher, args.port, args.watch, args.interval)
+
 
 def main():
-    basepath = argv[1] if len(argv) > 1 else "/"
-    remove_and_replace_dir_content("static", "docs")
-    generate_pages_recursive("content", "template.html", "docs", basepath)
+    if sys.argv[1:2] == ["serve"]:
+        serve(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["daemon"]:
+        daemon(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["depends"]:
+        depends(sys.argv[2:])
+        return
+    args = parse_args(sys.argv[1:])
+    profile = BuildProfile() if args.profile else NULL_PROFILE
+    inline_memo.resize(args.inline_memo_size)
+    cache = None if args.no_cache else PageCache(args.cache_dir, args.cache_size * 1024 * 1024)
+    # Minifying rewrote pages and stylesheets in place, so turning it off has to write them all again.
+    rewrite = not args.minify and was_minified(OUTPUT_MANIFEST_PATH, "docs")
+    with profile.phase("static copy"):
+        assets, changed_assets = sync_dir_content("static", "docs", ASSET_MANIFEST_PATH, fingerprint=args.fingerprint_assets,
+                                                  exclude=args.exclude, rewrite=rewrite)
+    try:
+        generate_pages_recursive("content", "template.html", "docs", args.basepath, MANIFEST_PATH, args.jobs, profile, cache, GRAPH_PATH,
+                                 index_path=INDEX_PATH, site_url=args.site_url, assets=assets, changed_assets=changed_assets,
+                                 exclude=args.exclude, rewrite=rewrite)
+        with profile.phase("output"):
+            if optimize_output("docs", OUTPUT_MANIFEST_PATH, args.minify, args.precompress, max(args.jobs, READ_THREADS)):
+                sys.exit("Failed to optimize some of the output files.")
+    except PageGenerationError as error:
+        sys.exit(str(error))
+    finally:
+        if profile.enabled:
+            print(profile.report(args.profile_top))
+            profile.save(args.profile_output, args.profile_top)
 
-main()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
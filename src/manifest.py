@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+
+MANIFEST_VERSION = 1
+
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_lines(lines):
+    digest = hashlib.sha256()
+    for line in lines:
+        digest.update(line.encode())
+    return digest.hexdigest()
+
+
+def page_hash(source_hash, template):
+    return hash_bytes(f"{template.digest}:{source_hash}".encode())
+
+
+def new_manifest(basepath):
+    return {"version": MANIFEST_VERSION, "basepath": basepath, "pages": {}}
+
+
+def load_manifest(manifest_path, basepath):
+    manifest = None
+    if os.path.exists(manifest_path) and os.path.isfile(manifest_path):
+        try:
+            with open(manifest_path) as manifest_file:
+                manifest = json.load(manifest_file)
+        except (OSError, ValueError):
+            manifest = None
+    if not manifest or manifest.get("version") != MANIFEST_VERSION:
+        return new_manifest(basepath)
+    if manifest["basepath"] != basepath:
+        # Every page depends on the basepath, so keep the recorded outputs (stale
+        # ones still have to be removed) but forget their hashes.
+        for entry in manifest["pages"].values():
+            entry["hash"] = None
+        manifest["basepath"] = basepath
+    manifest.pop("template", None)
+    return manifest
+
+
+def load_asset_manifest(manifest_path):
+    manifest = None
+    if os.path.exists(manifest_path) and os.path.isfile(manifest_path):
+        try:
+            with open(manifest_path) as manifest_file:
+                manifest = json.load(manifest_file)
+        except (OSError, ValueError):
+            manifest = None
+    if not manifest or manifest.get("version") != MANIFEST_VERSION:
+        return {"version": MANIFEST_VERSION, "assets": {}}
+    return manifest
+
+
+def save_manifest(manifest, manifest_path):
+    manifest_dir = os.path.dirname(manifest_path)
+    if manifest_dir:
+        os.makedirs(manifest_dir, exist_ok=True)
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=1, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+
+def known_page_hash(manifest, from_path, dest_path):
+    entry = manifest["pages"].get(from_path)
+    if entry is None or entry["dest"] != dest_path or not os.path.isfile(dest_path):
+        return None
+    return entry["hash"]
+
+
+def record_page(manifest, from_path, source_hash, dest_path):
+    manifest["pages"][from_path] = {"hash": source_hash, "dest": dest_path}
+
+
+def is_asset_fresh(manifest, rel_path, asset_entry):
+    entry = manifest["assets"].get(rel_path)
+    if entry is None:
+        return False
+    if "hash" in asset_entry:
+        return entry.get("hash") == asset_entry["hash"]
+    return entry["size"] == asset_entry["size"] and entry["mtime"] == asset_entry["mtime"]
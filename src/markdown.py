@@ -1,7 +1,17 @@
 import re
 from enum import Enum
-from htmlnode import ParentNode
-from textnode import (TextNode, TextType, text_to_textnodes, text_node_to_html_node)
+from html import escape
+from itertools import chain
+from highlight import highlight
+from htmlnode import LeafNode, ParentNode
+from memo import LruMemo
+from textnode import (TextType, text_to_textnodes, text_node_to_html_node)
+
+PARSER_VERSION = "3"
+
+inline_memo = LruMemo()
+# Only a bare language name on the opening fence's line counts, text right after the backticks stays code.
+CODE_LANGUAGE_PATTERN = re.compile(r"([A-Za-z][\w+#.-]*)[ \t]*\n")
 
 class BlockType(Enum):
     PARAGRAPH = "paragraph"
@@ -11,75 +21,282 @@ class BlockType(Enum):
     UNORDERED_LIST = "unordered_list"
     ORDERED_LIST = "ordered_list"
 
-def markdown_to_blocks(markdown):
-    return re.split(r"\s*\n\s*\n\s*", markdown.strip())
 
-def block_to_block_type(block):
-    if len(re.findall(r"^#{1,6}", block)):
-        return BlockType.HEADING
-    if block.startswith("```") and block.endswith("```"):
-        return BlockType.CODE
-    lines = block.split("\n")
-    if len(list(filter(lambda line: line.startswith(">"), lines))) == len(lines):
-        return BlockType.QUOTE
-    if len(list(filter(lambda line: line.startswith("- "), lines))) == len(lines):
-        return BlockType.UNORDERED_LIST
-    is_ol = True
-    for i in range(len(lines)):
-        if lines[i].startswith(f"{i+1}. "):
+class Block:
+
+    def __init__(self, block_type, text, level=0, start_line=0, end_line=0):
+        self.block_type = block_type
+        self.text = text
+        self.level = level
+        self.start_line = start_line
+        self.end_line = end_line
+
+    def __eq__(self, other):
+        return (self.block_type == other.block_type and self.text == other.text and self.level == other.level
+                and self.start_line == other.start_line and self.end_line == other.end_line)
+
+    def __repr__(self):
+        return f"Block({self.block_type.value}, {self.text!r}, level: {self.level}, lines: {self.start_line}-{self.end_line})"
+
+
+class BlockClassifier:
+
+    def __init__(self):
+        self.line_count = 0
+        self.first_line = None
+        self.last_line = None
+        self.all_quote = True
+        self.all_unordered = True
+        self.all_ordered = True
+
+    def add(self, line):
+        if self.first_line is None:
+            self.first_line = line
+        self.last_line = line
+        if self.all_quote and not line.startswith(">"):
+            self.all_quote = False
+        if self.all_unordered and not line.startswith("- "):
+            self.all_unordered = False
+        if self.all_ordered and not line.startswith(f"{self.line_count + 1}. "):
+            self.all_ordered = False
+        self.line_count += 1
+
+    def classify(self):
+        if self.first_line.startswith("#"):
+            return BlockType.HEADING, min(len(self.first_line) - len(self.first_line.lstrip("#")), 6)
+        if self.first_line.startswith("```") and self.last_line.endswith("```"):
+            return BlockType.CODE, 0
+        if self.all_quote:
+            return BlockType.QUOTE, 0
+        if self.all_unordered:
+            return BlockType.UNORDERED_LIST, 0
+        if self.all_ordered:
+            return BlockType.ORDERED_LIST, 0
+        return BlockType.PARAGRAPH, 0
+
+
+def scan_blocks(lines):
+    block_lines = []
+    classifier = None
+    start_line = 0
+    line_number = 0
+    for line in lines:
+        line_number += 1
+        line = line.removesuffix("\n")
+        if line.isspace() or not line:
+            if block_lines:
+                yield finish_block(block_lines, classifier, start_line, line_number - 1)
+                block_lines = []
             continue
+        if block_lines:
+            classifier.add(block_lines[-1])
         else:
-            is_ol = False
-            break
-    if is_ol:
-        return BlockType.ORDERED_LIST
-    return BlockType.PARAGRAPH
+            classifier = BlockClassifier()
+            start_line = line_number
+            line = line.lstrip()
+        block_lines.append(line)
+    if block_lines:
+        yield finish_block(block_lines, classifier, start_line, line_number)
+
 
+def finish_block(block_lines, classifier, start_line, end_line):
+    block_lines[-1] = block_lines[-1].rstrip()
+    classifier.add(block_lines[-1])
+    block_type, level = classifier.classify()
+    return Block(block_type, "\n".join(block_lines), level, start_line, end_line)
 
-def markdown_to_html_node(markdown):
-    blocks = markdown_to_blocks(markdown)
+
+def split_front_matter(markdown):
+    if not markdown.startswith("---\n"):
+        return {}, markdown
+    end = markdown.find("\n---\n", 3)
+    if end != -1:
+        body = markdown[end + 5:]
+    elif markdown.endswith("\n---"):
+        end = len(markdown) - 4
+        body = ""
+    else:
+        return {}, markdown
+    return parse_front_matter(markdown[4:end].split("\n")), body
+
+
+def split_front_matter_lines(lines):
+    lines = iter(lines)
+    first_line = next(lines, None)
+    if first_line is None:
+        return {}, lines
+    if first_line.rstrip("\n") != "---":
+        return {}, chain([first_line], lines)
+    front_matter = []
+    for line in lines:
+        if line.rstrip("\n") == "---":
+            return parse_front_matter(line.rstrip("\n") for line in front_matter), lines
+        front_matter.append(line)
+    return {}, chain([first_line], front_matter)
+
+
+def parse_front_matter(lines):
+    front_matter = {}
+    for line in lines:
+        key, separator, value = line.partition(":")
+        if separator and key.strip():
+            front_matter[key.strip()] = value.strip()
+    return front_matter
+
+
+def scan_markdown(markdown):
+    blocks = list(scan_blocks(markdown.split("\n")))
+    return blocks if blocks else [Block(BlockType.PARAGRAPH, "", 0, 1, 1)]
+
+
+def markdown_to_blocks(markdown):
+    return [block.text for block in scan_markdown(markdown)]
+
+
+def block_to_block_type(block):
+    classifier = BlockClassifier()
+    for line in block.split("\n"):
+        classifier.add(line)
+    return classifier.classify()[0]
+
+
+def markdown_to_html_node(markdown, resolve_url=None):
+    return blocks_to_html_node(scan_markdown(markdown), resolve_url)
+
+
+def blocks_to_html_node(blocks, resolve_url=None, references=None):
     parent_node = ParentNode("div", [])
     for block in blocks:
-        block_type = block_to_block_type(block)
-        match block_type:
-            case BlockType.PARAGRAPH:
-                parent_node.children.append(ParentNode("p", text_to_inline_html(block)))
-            case BlockType.QUOTE:
-                parent_node.children.append(ParentNode("blockquote", text_to_inline_html(block.replace("\n>", " ").removeprefix(">").lstrip())))
-            case BlockType.HEADING:
-                hash_count = re.findall(r"^#{1,6}", block)[0].count("#")
-                parent_node.children.append(ParentNode(f"h{hash_count}", text_to_inline_html(block.replace("#", "", hash_count).lstrip())))
-            case BlockType.UNORDERED_LIST | BlockType.ORDERED_LIST:
-                parent_node.children.append(list_block_to_html(block, block_type))
-            case BlockType.CODE:
-                parent_node.children.append(ParentNode("pre", [text_node_to_html_node(TextNode(block.removeprefix("```").removesuffix("```"), TextType.CODE))]))
+        parent_node.children.append(block_to_html_node(block, resolve_url, references))
     return parent_node
 
 
-def text_to_inline_html(text):
+def markdown_lines_to_html(lines, resolve_url=None, references=None):
+    yield "<div>"
+    is_empty = True
+    for block in scan_blocks(lines):
+        is_empty = False
+        yield from block_to_html_node(block, resolve_url, references).iter_html()
+    if is_empty:
+        yield "<p></p>"
+    yield "</div>"
+
+
+def block_to_html_node(block, resolve_url=None, references=None):
+    match block.block_type:
+        case BlockType.PARAGRAPH:
+            return ParentNode("p", text_to_inline_html(block_inline_texts(block)[0], resolve_url, references))
+        case BlockType.QUOTE:
+            return ParentNode("blockquote", text_to_inline_html(block_inline_texts(block)[0], resolve_url, references))
+        case BlockType.HEADING:
+            return ParentNode(f"h{block.level}", text_to_inline_html(block_inline_texts(block)[0], resolve_url, references))
+        case BlockType.UNORDERED_LIST | BlockType.ORDERED_LIST:
+            return list_block_to_html(block.text, block.block_type, resolve_url, references)
+        case BlockType.CODE:
+            return code_block_to_html(block.text)
+
+
+def split_code_language(block_text):
+    code = block_text.removeprefix("```").removesuffix("```")
+    match = CODE_LANGUAGE_PATTERN.match(code)
+    if match is None:
+        return None, code
+    return match.group(1).lower(), code[match.end():]
+
+
+def code_block_to_html(block_text):
+    # Code is shown as written, so it is escaped the same way whether or not a lexer highlights it.
+    language, code = split_code_language(block_text)
+    if language is None:
+        return ParentNode("pre", [LeafNode("code", escape(code, quote=False))])
+    highlighted = highlight(language, code)
+    return ParentNode("pre", [LeafNode("code", escape(code, quote=False) if highlighted is None else highlighted,
+                                       {"class": f"language-{language}"})])
+
+
+def text_to_inline_html(text, resolve_url=None, references=None):
+    html_nodes, text_references = inline_memo.lookup(text, (text, resolve_url), lambda: render_inline_html(text, resolve_url))
+    if references is not None:
+        references.extend(text_references)
+    return list(html_nodes)
+
+
+def render_inline_html(text, resolve_url=None):
     text_nodes = text_to_textnodes(re.sub(r"\s+", " ", text))
-    return list(map(lambda text_node: text_node_to_html_node(text_node), text_nodes))
+    # The links and images are kept next to the HTML, so the dependency graph needs no second parse.
+    references = tuple((text_node.text_type.value, text_node.url) for text_node in text_nodes
+                       if text_node.text_type in (TextType.IMAGE, TextType.LINK))
+    return tuple(map(lambda text_node: text_node_to_html_node(text_node, resolve_url), text_nodes)), references
 
 
-def list_block_to_html(block_text, block_type = BlockType.UNORDERED_LIST):
+def list_block_to_html(block_text, block_type = BlockType.UNORDERED_LIST, resolve_url=None, references=None):
     if block_type not in [BlockType.UNORDERED_LIST, BlockType.ORDERED_LIST]:
         raise ValueError(f"Invalid list type as 2nd argument. It can only be {BlockType.UNORDERED_LIST} or {BlockType.ORDERED_LIST}")
-    list_items = block_text.split("\n")
-    if block_type == BlockType.ORDERED_LIST:
-        list_tag = "ol"
-        list_items = list(map(lambda li: re.sub(r"^\d+\. ", "", li), list_items))
-    else:
-        list_tag = "ul"
-        list_items = list(map(lambda li: li.removeprefix("- "), list_items))
-    list_node = ParentNode(list_tag, [])
-    for list_item in list_items:
-        list_node.children.append(ParentNode("li", text_to_inline_html(list_item)))
+    list_node = ParentNode("ol" if block_type == BlockType.ORDERED_LIST else "ul", [])
+    for list_item in list_item_texts(block_text, block_type):
+        list_node.children.append(ParentNode("li", text_to_inline_html(list_item, resolve_url, references)))
     return list_node
 
 
+def list_item_texts(block_text, block_type):
+    if block_type == BlockType.ORDERED_LIST:
+        return [re.sub(r"^\d+\. ", "", li) for li in block_text.split("\n")]
+    return [li.removeprefix("- ") for li in block_text.split("\n")]
+
+
+def block_inline_texts(block):
+    match block.block_type:
+        case BlockType.PARAGRAPH:
+            return [block.text]
+        case BlockType.QUOTE:
+            return [block.text.replace("\n>", " ").removeprefix(">").lstrip()]
+        case BlockType.HEADING:
+            return [block.text[block.level:].lstrip()]
+        case BlockType.UNORDERED_LIST | BlockType.ORDERED_LIST:
+            return list_item_texts(block.text, block.block_type)
+    return []
+
+
 def extract_title(markdown):
-    blocks = markdown_to_blocks(markdown)
+    return extract_title_from_blocks(scan_markdown(markdown))
+
+
+def extract_title_from_blocks(blocks):
+    for block in blocks:
+        if block.text.startswith("#") and not block.text.startswith("##"):
+            return block.text.lstrip("# ")
+    raise Exception("There is no h1 header in markdown.")
+
+
+def scan_title(lines):
+    title_lines = None
+    in_block = False
+    for line in lines:
+        line = line.removesuffix("\n")
+        if line.isspace() or not line:
+            if title_lines is not None:
+                break
+            in_block = False
+        elif title_lines is not None:
+            title_lines.append(line)
+        elif not in_block:
+            in_block = True
+            line = line.lstrip()
+            if line.startswith("#") and not line.startswith("##"):
+                title_lines = [line]
+    if title_lines is None:
+        raise Exception("There is no h1 header in markdown.")
+    title_lines[-1] = title_lines[-1].rstrip()
+    return "\n".join(title_lines).lstrip("# ")
+
+
+def extract_references_from_blocks(blocks):
+    references = []
     for block in blocks:
-        if block.startswith("#") and not block.startswith("##"):
-            return block.lstrip("# ")
-    raise Exception("There is no h1 header in markdown.")
\ No newline at end of file
+        for text in block_inline_texts(block):
+            if "](" not in text:
+                continue
+            for text_node in text_to_textnodes(re.sub(r"\s+", " ", text)):
+                if text_node.text_type in (TextType.IMAGE, TextType.LINK):
+                    references.append((text_node.text_type.value, text_node.url))
+    return references
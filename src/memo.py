@@ -0,0 +1,44 @@
+import threading
+from collections import OrderedDict
+
+
+class LruMemo:
+
+    def __init__(self, max_entries=4096, max_key_length=2048):
+        self.max_entries = max_entries
+        self.max_key_length = max_key_length
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # The render daemon serves requests from several threads. compute() runs outside the
+        # lock because it may look up other fragments in the same memo.
+        self.lock = threading.Lock()
+
+    def lookup(self, text, key, compute):
+        if self.max_entries <= 0 or len(text) > self.max_key_length:
+            return compute()
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+        value = compute()
+        with self.lock:
+            self.entries[key] = value
+            while len(self.entries) > max(self.max_entries, 0):
+                self.entries.popitem(last=False)
+        return value
+
+    def resize(self, max_entries):
+        with self.lock:
+            self.max_entries = max_entries
+            while len(self.entries) > max(max_entries, 0):
+                self.entries.popitem(last=False)
+
+    def counters(self):
+        return self.hits, self.misses
+
+    def __repr__(self):
+        return f"LruMemo({len(self.entries)}/{self.max_entries} entries, hits: {self.hits}, misses: {self.misses})"
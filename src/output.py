@@ -0,0 +1,184 @@
+import gzip
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from manifest import hash_bytes, save_manifest
+from pipeline import READ_THREADS, bounded_map
+from walker import matches, walk_files
+
+OUTPUT_VERSION = 1
+MINIFY_PATTERNS = ["*.html", "*.css"]
+COMPRESS_PATTERNS = ["*.html", "*.css", "*.js", "*.json", "*.xml", "*.svg", "*.txt"]
+SIDECAR_SUFFIX = ".gz"
+
+# Whitespace inside these elements is significant or isn't HTML, so it is kept as written.
+HTML_PROTECTED_PATTERN = re.compile(r"(<(pre|textarea|script|style)\b[^>]*>)([\s\S]*?)(</\2\s*>)|<!--(?!\[if)[\s\S]*?-->", re.IGNORECASE)
+HTML_BLOCK_TAG_PATTERN = re.compile(
+    r"\s*(</?(?:!doctype|html|head|body|meta|link|title|base|article|section|header|footer|nav|main|aside|div|p|h[1-6]|ul|ol|li"
+    r"|dl|dt|dd|blockquote|pre|table|thead|tbody|tr|th|td|form|hr|br|script|style)\b[^>]*>)\s*",
+    re.IGNORECASE
+)
+CSS_SKIP_PATTERN = re.compile(r"\"(?:[^\"\\]|\\.)*\"|'(?:[^'\\]|\\.)*'|/\*[\s\S]*?\*/")
+CSS_PUNCTUATION_PATTERN = re.compile(r"\s*([{};,>])\s*|(:)\s+")
+CSS_STRING_PLACEHOLDER_PATTERN = re.compile(r"\0(\d+)\0")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def minify_html_text(text):
+    return HTML_BLOCK_TAG_PATTERN.sub(r"\1", WHITESPACE_PATTERN.sub(" ", text))
+
+
+def minify_html(html):
+    parts = []
+    position = 0
+    for match in HTML_PROTECTED_PATTERN.finditer(html):
+        parts.append(minify_html_text(html[position:match.start()]))
+        if match.group(1):
+            body = minify_css(match.group(3)) if match.group(2).lower() == "style" else match.group(3)
+            parts.append(minify_html_text(match.group(1)) + body + match.group(4))
+        position = match.end()
+    parts.append(minify_html_text(html[position:]))
+    return "".join(parts).strip()
+
+
+def minify_css(css):
+    strings = []
+
+    def skip(match):
+        if match.group().startswith("/*"):
+            return " "
+        strings.append(match.group())
+        return f"\0{len(strings) - 1}\0"
+
+    code = WHITESPACE_PATTERN.sub(" ", CSS_SKIP_PATTERN.sub(skip, css))
+    code = CSS_PUNCTUATION_PATTERN.sub(lambda match: match.group(1) or match.group(2), code).replace(";}", "}")
+    return CSS_STRING_PLACEHOLDER_PATTERN.sub(lambda match: strings[int(match.group(1))], code.strip())
+
+
+def minify(rel_path, text):
+    if rel_path.endswith(".css"):
+        return minify_css(text)
+    return minify_html(text)
+
+
+class OutputResult:
+
+    def __init__(self, rel_path, entry=None, minified_saved=0, compressed_saved=0, recompressed=False, sidecar_removed=False,
+                 error=None):
+        self.rel_path = rel_path
+        self.entry = entry
+        self.minified_saved = minified_saved
+        self.compressed_saved = compressed_saved
+        self.recompressed = recompressed
+        self.sidecar_removed = sidecar_removed
+        self.error = error
+
+    def __repr__(self):
+        return f"OutputResult({self.rel_path}, recompressed: {self.recompressed}, {self.error})"
+
+
+def optimize_file(dest_dir, use_minify, precompress, item):
+    rel_path, known_entry = item
+    path = os.path.join(dest_dir, rel_path)
+    sidecar_path = path + SIDECAR_SUFFIX
+    try:
+        with open(path, "rb") as output_file:
+            data = output_file.read()
+        minified_saved = 0
+        if use_minify and matches(rel_path, os.path.basename(rel_path), MINIFY_PATTERNS):
+            minified = minify(rel_path, data.decode()).encode()
+            if minified != data:
+                minified_saved = len(data) - len(minified)
+                data = minified
+                with open(f"{path}.tmp", "wb") as output_file:
+                    output_file.write(data)
+                os.replace(f"{path}.tmp", path)
+        content_hash = hash_bytes(data)
+        compressed = False
+        compressed_saved = 0
+        # The writers rewrite unchanged outputs now and then, only a new hash is worth compressing again.
+        if precompress and known_entry and known_entry["hash"] == content_hash and known_entry["compressed"] == os.path.isfile(sidecar_path):
+            compressed = known_entry["compressed"]
+        elif precompress:
+            sidecar = gzip.compress(data, compresslevel=9, mtime=0)
+            if len(sidecar) < len(data):
+                with open(f"{sidecar_path}.tmp", "wb") as sidecar_file:
+                    sidecar_file.write(sidecar)
+                os.replace(f"{sidecar_path}.tmp", sidecar_path)
+                compressed = True
+                compressed_saved = len(data) - len(sidecar)
+        sidecar_removed = not compressed and os.path.isfile(sidecar_path)
+        if sidecar_removed:
+            os.remove(sidecar_path)
+        stat = os.stat(path)
+        entry = {"size": stat.st_size, "mtime": stat.st_mtime_ns, "hash": content_hash, "compressed": compressed}
+        return OutputResult(rel_path, entry, minified_saved, compressed_saved, compressed_saved > 0, sidecar_removed)
+    except (OSError, UnicodeDecodeError) as error:
+        return OutputResult(rel_path, error=f"Failed to optimize {path}: {error!r}")
+
+
+def is_output_fresh(known_entry, entry):
+    return known_entry is not None and known_entry["size"] == entry.st_size and known_entry["mtime"] == entry.st_mtime_ns
+
+
+def load_output_manifest(manifest_path, dest_dir):
+    manifest = None
+    if os.path.exists(manifest_path) and os.path.isfile(manifest_path):
+        try:
+            with open(manifest_path) as manifest_file:
+                manifest = json.load(manifest_file)
+        except (OSError, ValueError):
+            manifest = None
+    if not manifest or manifest.get("version") != OUTPUT_VERSION or manifest.get("dest") != dest_dir:
+        return {"version": OUTPUT_VERSION, "dest": dest_dir, "minify": False, "precompress": False, "files": {}}
+    return manifest
+
+
+def was_minified(manifest_path, dest_dir):
+    return load_output_manifest(manifest_path, dest_dir)["minify"]
+
+
+def optimize_output(dest_dir, manifest_path, use_minify=False, precompress=False, threads=READ_THREADS):
+    manifest = load_output_manifest(manifest_path, dest_dir)
+    if not (use_minify or precompress or manifest["files"]):
+        return 0
+    same_options = manifest["minify"] == use_minify and manifest["precompress"] == precompress
+    known_files = manifest["files"]
+    files = {}
+    pending = []
+    for entry, rel_path in walk_files(dest_dir, include=COMPRESS_PATTERNS, exclude=[f"*{SIDECAR_SUFFIX}", "*.tmp"]):
+        known_entry = known_files.get(rel_path)
+        if same_options and is_output_fresh(known_entry, entry.stat()):
+            files[rel_path] = known_entry
+        else:
+            pending.append((rel_path, known_entry if same_options else None))
+    minified_saved = 0
+    compressed_saved = 0
+    recompressed = 0
+    removed = 0
+    errors = []
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for result in bounded_map(executor, partial(optimize_file, dest_dir, use_minify, precompress), pending):
+            if result.error:
+                errors.append(result.error)
+                continue
+            files[result.rel_path] = result.entry
+            minified_saved += result.minified_saved
+            compressed_saved += result.compressed_saved
+            recompressed += result.recompressed
+            removed += result.sidecar_removed
+    for rel_path, known_entry in known_files.items():
+        sidecar_path = os.path.join(dest_dir, rel_path) + SIDECAR_SUFFIX
+        if rel_path not in files and known_entry["compressed"] and os.path.isfile(sidecar_path):
+            os.remove(sidecar_path)
+            removed += 1
+    manifest.update({"minify": use_minify, "precompress": precompress, "files": files if use_minify or precompress else {}})
+    save_manifest(manifest, manifest_path)
+    for error in errors:
+        print(error)
+    print(f"Optimized {dest_dir}: {len(pending) - len(errors)} checked, {len(files) - len(pending) + len(errors)} unchanged, "
+          f"{recompressed} compressed, {removed} sidecars removed. "
+          f"Saved {minified_saved} bytes by minifying and {compressed_saved} bytes in sidecars.")
+    return len(errors)
@@ -0,0 +1,91 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+READ_THREADS = 4
+QUEUE_SIZE = 64
+
+
+def process_pool(max_workers, initializer=None, initargs=()):
+    # The pool is started while reader, writer or request threads are running, and forking a
+    # process with threads can deadlock the children, so workers come from a fork server instead.
+    context = multiprocessing.get_context("forkserver") if "forkserver" in multiprocessing.get_all_start_methods() else None
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=context, initializer=initializer, initargs=initargs)
+
+
+def bounded_map(executor, function, items, limit=QUEUE_SIZE):
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(function, item))
+        if len(pending) >= limit:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def write_file(dest_path, chunks, made_dirs=None):
+    dest_path_dir = os.path.dirname(dest_path)
+    if dest_path_dir and (made_dirs is None or dest_path_dir not in made_dirs):
+        os.makedirs(dest_path_dir, exist_ok=True)
+        if made_dirs is not None:
+            made_dirs.add(dest_path_dir)
+    try:
+        with open(f"{dest_path}.tmp", "w") as dest_file:
+            dest_file.writelines(chunks)
+    except Exception:
+        if os.path.exists(f"{dest_path}.tmp"):
+            os.remove(f"{dest_path}.tmp")
+        raise
+    os.replace(f"{dest_path}.tmp", dest_path)
+
+
+def remove_empty_dirs(dir_path, root_path):
+    root_path = os.path.abspath(root_path)
+    dir_path = os.path.abspath(dir_path)
+    while dir_path != root_path and dir_path.startswith(root_path + os.sep) and not os.listdir(dir_path):
+        os.rmdir(dir_path)
+        dir_path = os.path.dirname(dir_path)
+
+
+class PageWriter:
+
+    def __init__(self, queue_size=QUEUE_SIZE):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.made_dirs = set()
+        self.errors = []
+        self.seconds = 0.0
+        self.written = 0
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def put(self, from_path, dest_path, chunks):
+        self.queue.put((from_path, dest_path, chunks))
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.queue.maxsize:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            start = time.perf_counter()
+            for item in batch:
+                if item is None:
+                    self.seconds += time.perf_counter() - start
+                    return
+                from_path, dest_path, chunks = item
+                try:
+                    write_file(dest_path, chunks, self.made_dirs)
+                    self.written += 1
+                except Exception as error:
+                    self.errors.append((from_path, f"Failed to write page {dest_path} from {from_path}: {error!r}"))
+            self.seconds += time.perf_counter() - start
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
@@ -0,0 +1,145 @@
+import inspect
+import json
+import os
+import time
+from contextlib import contextmanager, nullcontext
+
+import markdown
+
+PARSER_PHASES = {
+    "scan_blocks": "block scanning",
+    "text_to_inline_html": "inline parsing",
+}
+PHASE_ORDER = [
+    "static copy", "directory walk", "read", "block scanning",
+    "inline parsing", "tree building", "serialization", "write",
+]
+
+active_profile = None
+
+
+class BuildProfile:
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.calls = {}
+        self.pages = []
+
+    @contextmanager
+    def _timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def phase(self, name):
+        return self._timed(name) if self.enabled else nullcontext()
+
+    def add(self, name, seconds, calls=1):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+        self.calls[name] = self.calls.get(name, 0) + calls
+
+    def merge(self, phases):
+        for name, (seconds, calls) in phases.items():
+            self.add(name, seconds, calls)
+
+    def export(self):
+        return {name: (seconds, self.calls[name]) for name, seconds in self.phases.items()}
+
+    def add_page(self, from_path, phases):
+        self.merge(phases)
+        self.pages.append((sum(seconds for seconds, _ in phases.values()), from_path))
+
+    def slowest_pages(self, count):
+        return sorted(self.pages, reverse=True)[:count]
+
+    def ordered_phases(self):
+        names = [name for name in PHASE_ORDER if name in self.phases]
+        return names + sorted(name for name in self.phases if name not in names)
+
+    def report(self, slowest=10):
+        wall = time.perf_counter() - self.started
+        total = sum(self.phases.values()) or 1.0
+        lines = [f"Build profile: {len(self.pages)} pages rendered in {wall:.3f} s wall time", ""]
+        lines.append(f"{'phase':<24}{'seconds':>10}{'share':>9}{'calls':>10}")
+        for name in self.ordered_phases():
+            lines.append(f"{name:<24}{self.phases[name]:>10.3f}{self.phases[name] / total:>9.1%}{self.calls[name]:>10}")
+        if self.pages:
+            lines.extend(["", f"Slowest {min(slowest, len(self.pages))} pages:"])
+            for seconds, from_path in self.slowest_pages(slowest):
+                lines.append(f"{seconds:>10.4f} s  {from_path}")
+        return "\n".join(lines)
+
+    def to_json(self, slowest=10):
+        return {
+            "wall_seconds": time.perf_counter() - self.started,
+            "pages_rendered": len(self.pages),
+            "phases": {name: {"seconds": self.phases[name], "calls": self.calls[name]} for name in self.ordered_phases()},
+            "slowest_pages": [{"path": from_path, "seconds": seconds} for seconds, from_path in self.slowest_pages(slowest)],
+        }
+
+    def save(self, path, slowest=10):
+        path_dir = os.path.dirname(path)
+        if path_dir:
+            os.makedirs(path_dir, exist_ok=True)
+        with open(path, "w") as profile_file:
+            json.dump(self.to_json(slowest), profile_file, indent=1)
+
+
+NULL_PROFILE = BuildProfile(enabled=False)
+
+
+def profiled(phase, function):
+    def wrapper(*args, **kwargs):
+        if active_profile is None:
+            return function(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            active_profile.add(phase, time.perf_counter() - start)
+    wrapper.profiled_function = function
+    return wrapper
+
+
+def profiled_generator(phase, function):
+    def wrapper(*args, **kwargs):
+        iterator = function(*args, **kwargs)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                if active_profile is not None:
+                    active_profile.add(phase, time.perf_counter() - start)
+                return
+            if active_profile is not None:
+                active_profile.add(phase, time.perf_counter() - start, 0)
+            yield item
+    wrapper.profiled_function = function
+    return wrapper
+
+
+def install_parser_hooks():
+    for name, phase in PARSER_PHASES.items():
+        function = getattr(markdown, name)
+        if not hasattr(function, "profiled_function"):
+            wrap = profiled_generator if inspect.isgeneratorfunction(function) else profiled
+            setattr(markdown, name, wrap(phase, function))
+
+
+@contextmanager
+def profile_page():
+    global active_profile
+    install_parser_hooks()
+    active_profile = BuildProfile()
+    try:
+        yield active_profile
+    finally:
+        nested = sum(active_profile.phases.get(phase, 0.0) for phase in PARSER_PHASES.values())
+        if "tree building" in active_profile.phases:
+            active_profile.phases["tree building"] -= nested
+        active_profile = None
@@ -0,0 +1,144 @@
+import os
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from content import sync_dir_content, generate_pages_recursive, render_pages, remove_pages, page_dest_path, find_pages, PageGenerationError
+from manifest import load_manifest, save_manifest
+from graph import load_graph
+from siteindex import load_site_index
+from template import TEMPLATE_FILE_NAME, TemplateCache
+from walker import walk_files
+
+
+def snapshot(paths):
+    files = {}
+    for path in paths:
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            files[path] = (stat.st_mtime_ns, stat.st_size)
+            continue
+        for entry, _ in walk_files(path):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            files[entry.path] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+def changed_paths(old_snapshot, new_snapshot):
+    return sorted(path for path in old_snapshot.keys() | new_snapshot.keys() if old_snapshot.get(path) != new_snapshot.get(path))
+
+
+class SiteWatcher:
+
+    def __init__(self, static_dir, content_dir, template_path, dest_dir, basepath, manifest_path, asset_manifest_path, graph_path=None,
+                 index_path=None):
+        self.static_dir = static_dir
+        self.content_dir = content_dir
+        self.template_path = template_path
+        self.dest_dir = dest_dir
+        self.basepath = basepath
+        self.manifest_path = manifest_path
+        self.asset_manifest_path = asset_manifest_path
+        self.graph_path = graph_path if graph_path else os.path.join(os.path.dirname(manifest_path), "graph.json")
+        self.index_path = index_path if index_path else os.path.join(os.path.dirname(manifest_path), "index.json")
+        self.templates = None
+        self.manifest = None
+        self.graph = None
+        self.site_index = None
+
+    def watched_paths(self):
+        return [self.static_dir, self.content_dir, self.template_path]
+
+    def build(self):
+        _, changed_assets = sync_dir_content(self.static_dir, self.dest_dir, self.asset_manifest_path)
+        try:
+            generate_pages_recursive(self.content_dir, self.template_path, self.dest_dir, self.basepath, self.manifest_path,
+                                     graph_path=self.graph_path, static_dir=self.static_dir, index_path=self.index_path,
+                                     changed_assets=changed_assets)
+        finally:
+            self.load_templates()
+            self.manifest = load_manifest(self.manifest_path, self.basepath)
+            self.graph = load_graph(self.graph_path, self.content_dir, self.static_dir)
+            self.site_index = load_site_index(self.index_path, self.dest_dir)
+
+    def load_templates(self):
+        dir_templates = {}
+        find_pages(self.content_dir, self.dest_dir, dir_templates)
+        self.templates = TemplateCache(self.template_path, self.basepath, dir_templates)
+
+    def rebuild(self, paths):
+        template_paths = [path for path in paths if path == self.template_path or os.path.basename(path) == TEMPLATE_FILE_NAME]
+        if any(os.path.isfile(path) != (path in self.templates.dir_templates.values())
+               for path in template_paths if path != self.template_path):
+            self.build()
+            return
+        if template_paths:
+            self.load_templates()
+        if any(path.startswith(self.static_dir + os.sep) for path in paths):
+            sync_dir_content(self.static_dir, self.dest_dir, self.asset_manifest_path)
+        sources = self.graph.rebuild_set(paths)
+        pages = [(path, page_dest_path(path, self.content_dir, self.dest_dir)) for path in sources if os.path.isfile(path)]
+        generated, errors, _ = render_pages(pages, self.templates, self.manifest, graph=self.graph, site_index=self.site_index)
+        deleted = [path for path in sources if not os.path.isfile(path)]
+        removed = remove_pages(self.manifest, deleted, self.dest_dir)
+        for path in deleted:
+            self.graph.remove(path)
+            self.site_index.remove(path)
+        if sources:
+            self.site_index.write(self.templates, self.content_dir)
+        save_manifest(self.manifest, self.manifest_path)
+        self.graph.save(self.graph_path)
+        self.site_index.save(self.index_path)
+        for error in errors:
+            print(error)
+        if sources:
+            print(f"Regenerated {generated} pages, removed {removed}.")
+
+    def poll(self, last_snapshot):
+        new_snapshot = snapshot(self.watched_paths())
+        paths = changed_paths(last_snapshot, new_snapshot)
+        if not paths:
+            return last_snapshot
+        start = time.perf_counter()
+        try:
+            self.rebuild(paths)
+        except Exception as error:
+            # The old snapshot is kept, so the same changes are picked up again by the next scan.
+            print(f"Rebuild failed, retrying on the next scan: {error!r}")
+            return last_snapshot
+        print(f"Rebuilt {len(paths)} changed files in {time.perf_counter() - start:.3f} s.")
+        return new_snapshot
+
+    def watch(self, interval=0.25):
+        last_snapshot = snapshot(self.watched_paths())
+        while True:
+            time.sleep(interval)
+            last_snapshot = self.poll(last_snapshot)
+
+
+def start_server(dest_dir, port):
+    server = ThreadingHTTPServer(("", port), partial(SimpleHTTPRequestHandler, directory=dest_dir))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def serve_site(watcher, port=8888, watch=False, interval=0.25):
+    try:
+        watcher.build()
+    except PageGenerationError as error:
+        print(error)
+    server = start_server(watcher.dest_dir, port)
+    print(f"Serving {watcher.dest_dir} at http://localhost:{server.server_address[1]}{watcher.basepath}")
+    try:
+        if watch:
+            print(f"Watching {', '.join(watcher.watched_paths())} for changes...")
+            watcher.watch(interval)
+        else:
+            threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
@@ -0,0 +1,153 @@
+import json
+import os
+from datetime import datetime, timezone
+from xml.sax.saxutils import escape
+from htmlnode import LeafNode, ParentNode
+from manifest import hash_bytes, save_manifest
+from pipeline import remove_empty_dirs, write_file
+
+INDEX_VERSION = 3
+SITEMAP_NAME = "sitemap.xml"
+FEED_NAME = "feed.xml"
+FEED_PREFIX = "/blog/"
+FEED_SIZE = 20
+
+
+def page_url(dest_path, dest_dir):
+    url = "/" + os.path.relpath(dest_path, dest_dir).replace(os.sep, "/")
+    return url.removesuffix("index.html")
+
+
+def parent_url(url):
+    if url == "/":
+        return None
+    return url[:url.rstrip("/").rfind("/") + 1]
+
+
+def listing_title(url):
+    name = url.rstrip("/").rsplit("/", 1)[-1]
+    return name.replace("-", " ").replace("_", " ").capitalize() if name else "Index"
+
+
+def iso_time(mtime):
+    return datetime.fromtimestamp(mtime, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class SiteIndex:
+
+    def __init__(self, dest_dir, site_url="", pages=None, outputs=None):
+        self.dest_dir = dest_dir
+        self.site_url = site_url.rstrip("/")
+        self.pages = pages if pages else {}
+        self.outputs = outputs if outputs else {}
+
+    def record(self, from_path, dest_path, title):
+        stat = os.stat(from_path)
+        entry = {"url": page_url(dest_path, self.dest_dir), "title": title, "mtime": stat.st_mtime, "size": stat.st_size}
+        self.pages[from_path] = entry
+
+    def remove(self, from_path):
+        self.pages.pop(from_path, None)
+
+    def entries(self):
+        return sorted(self.pages.values(), key=lambda entry: (-entry["mtime"], entry["url"]))
+
+    def absolute_url(self, url, resolve_url):
+        return self.site_url + resolve_url(url)
+
+    def sitemap(self, resolve_url):
+        lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+        for entry in sorted(self.pages.values(), key=lambda entry: entry["url"]):
+            lines.append(f"<url><loc>{escape(self.absolute_url(entry['url'], resolve_url))}</loc>"
+                         f"<lastmod>{iso_time(entry['mtime'])[:10]}</lastmod></url>")
+        lines.append("</urlset>")
+        return "\n".join(lines) + "\n"
+
+    def feed(self, resolve_url, prefix=FEED_PREFIX, size=FEED_SIZE):
+        entries = [entry for entry in self.entries() if entry["url"].startswith(prefix) and entry["url"] != prefix][:size]
+        updated = iso_time(entries[0]["mtime"]) if entries else iso_time(0)
+        feed_url = self.absolute_url(prefix, resolve_url)
+        lines = [
+            '<?xml version="1.0" encoding="UTF-8"?>',
+            '<feed xmlns="http://www.w3.org/2005/Atom">',
+            f"<title>{escape(listing_title(prefix))}</title>",
+            f"<id>{escape(feed_url)}</id>",
+            f'<link href="{escape(feed_url)}"/>',
+            f"<updated>{updated}</updated>",
+        ]
+        for entry in entries:
+            url = escape(self.absolute_url(entry["url"], resolve_url))
+            lines.append(f'<entry><title>{escape(entry["title"])}</title><id>{url}</id><link href="{url}"/>'
+                         f"<updated>{iso_time(entry['mtime'])}</updated></entry>")
+        lines.append("</feed>")
+        return "\n".join(lines) + "\n"
+
+    def listing_pages(self):
+        urls = set(entry["url"] for entry in self.pages.values())
+        listings = {}
+        for entry in self.entries():
+            url = parent_url(entry["url"])
+            if url is not None and url not in urls:
+                listings.setdefault(url, []).append(entry)
+        return listings
+
+    def listing_html(self, entries, resolve_url):
+        list_node = ParentNode("ul", [])
+        for entry in entries:
+            link = LeafNode("a", entry["title"], {"href": resolve_url(entry["url"])})
+            list_node.children.append(ParentNode("li", [link]))
+        return ParentNode("div", [list_node]).to_html()
+
+    def listing_dest_path(self, url):
+        return os.path.join(self.dest_dir, *url.strip("/").split("/"), "index.html")
+
+    def write(self, templates, content_dir, rewrite=False):
+        resolve_url = templates.get(templates.default_path).resolve_url
+        outputs = {}
+        # Sitemaps and Atom feeds need absolute URLs, so they are only written once the site URL is known.
+        if self.site_url:
+            outputs[os.path.join(self.dest_dir, SITEMAP_NAME)] = self.sitemap(resolve_url)
+            outputs[os.path.join(self.dest_dir, FEED_NAME)] = self.feed(resolve_url)
+        for url, entries in self.listing_pages().items():
+            template = templates.select(os.path.join(content_dir, *url.strip("/").split("/"), "index.md"))
+            outputs[self.listing_dest_path(url)] = template.render(Title=listing_title(url), Content=self.listing_html(entries, resolve_url))
+        written = 0
+        hashes = {}
+        for dest_path, text in outputs.items():
+            # Compared by the hash of the generated text, the file itself may have been minified since.
+            hashes[dest_path] = hash_bytes(text.encode())
+            if rewrite or self.outputs.get(dest_path) != hashes[dest_path] or not os.path.isfile(dest_path):
+                write_file(dest_path, [text])
+                written += 1
+        page_paths = set(self.listing_dest_path(entry["url"]) for entry in self.pages.values() if entry["url"].endswith("/"))
+        removed = 0
+        for dest_path in self.outputs:
+            if dest_path not in outputs and dest_path not in page_paths and os.path.isfile(dest_path):
+                os.remove(dest_path)
+                remove_empty_dirs(os.path.dirname(dest_path), self.dest_dir)
+                removed += 1
+        self.outputs = hashes
+        return written, removed
+
+    def to_json(self):
+        return {"version": INDEX_VERSION, "dest": self.dest_dir, "site_url": self.site_url, "pages": self.pages, "outputs": self.outputs}
+
+    def save(self, index_path):
+        save_manifest(self.to_json(), index_path)
+
+    def __repr__(self):
+        return f"SiteIndex({self.dest_dir}, {self.site_url}, {len(self.pages)} pages, {len(self.outputs)} outputs)"
+
+
+def load_site_index(index_path, dest_dir, site_url=""):
+    index = None
+    if os.path.exists(index_path) and os.path.isfile(index_path):
+        try:
+            with open(index_path) as index_file:
+                index = json.load(index_file)
+        except (OSError, ValueError):
+            index = None
+    if not index or index.get("version") != INDEX_VERSION or index.get("dest") != dest_dir:
+        return SiteIndex(dest_dir, site_url)
+    # Builds without a site URL, like the dev server's, keep the one given to an earlier build.
+    return SiteIndex(dest_dir, site_url or index["site_url"], index["pages"], index["outputs"])
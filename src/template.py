@@ -0,0 +1,145 @@
+import json
+import os
+import re
+from manifest import hash_bytes
+
+PLACEHOLDER_PATTERN = re.compile(r"\{\{ (\w+) \}\}")
+ROOT_URL_PATTERN = re.compile(r"(href|src)=\"(/[^\"]*)\"")
+TEMPLATE_FILE_NAME = "_template.html"
+
+
+class UrlResolver:
+
+    def __init__(self, basepath="/", assets=None):
+        self.basepath = basepath
+        self.assets = assets if assets else {}
+        self.assets_digest = hash_bytes(json.dumps(self.assets, sort_keys=True).encode()) if self.assets else ""
+
+    def __call__(self, url):
+        if url.startswith("/"):
+            if self.assets:
+                path, suffix = split_url_suffix(url[1:])
+                return self.basepath + self.assets.get(path, path) + suffix
+            return self.basepath + url[1:]
+        return url
+
+    def assets_key(self, urls):
+        # A rendered body only depends on the fingerprinted names among its own URLs, not on the whole asset map.
+        used = {}
+        for url in urls:
+            if url.startswith("/"):
+                path = split_url_suffix(url[1:])[0]
+                if path in self.assets:
+                    used[path] = self.assets[path]
+        return hash_bytes(json.dumps(used, sort_keys=True).encode()) if used else ""
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.basepath == other.basepath and self.assets_digest == other.assets_digest
+
+    def __hash__(self):
+        return hash((self.basepath, self.assets_digest))
+
+    def __repr__(self):
+        return f"UrlResolver({self.basepath}, {len(self.assets)} fingerprinted assets)"
+
+
+def split_url_suffix(url):
+    end = len(url)
+    for separator in "?#":
+        position = url.find(separator)
+        if position != -1 and position < end:
+            end = position
+    return url[:end], url[end:]
+
+
+class Template:
+
+    def __init__(self, source, resolve_url=None, path=None):
+        self.path = path
+        self.resolve_url = resolve_url if resolve_url else UrlResolver()
+        source = ROOT_URL_PATTERN.sub(lambda match: f"{match[1]}=\"{self.resolve_url(match[2])}\"", source)
+        self.digest = hash_bytes(source.encode())
+        self.parts = []
+        self.slots = []
+        position = 0
+        for match in PLACEHOLDER_PATTERN.finditer(source):
+            self.parts.append(source[position:match.start()])
+            self.slots.append((len(self.parts), match[1], match[0]))
+            self.parts.append(match[0])
+            position = match.end()
+        self.parts.append(source[position:])
+
+    def render(self, **values):
+        parts = self.parts.copy()
+        for index, name, placeholder in self.slots:
+            parts[index] = values.get(name, placeholder)
+        return "".join(parts)
+
+    def iter_render(self, **values):
+        names = [name for _, name, _ in self.slots]
+        for name, value in values.items():
+            # A streamed value can only be read once, so it is kept when the template repeats its placeholder.
+            if not isinstance(value, str) and names.count(name) > 1:
+                values[name] = list(value)
+        slots = iter(self.slots)
+        next_slot = next(slots, None)
+        for index, part in enumerate(self.parts):
+            if next_slot is None or index != next_slot[0]:
+                yield part
+                continue
+            value = values.get(next_slot[1], part)
+            if isinstance(value, str):
+                yield value
+            else:
+                yield from value
+            next_slot = next(slots, None)
+
+    def write(self, file, **values):
+        file.writelines(self.iter_render(**values))
+
+    def __repr__(self):
+        return f"Template({self.path}, slots: {[name for _, name, _ in self.slots]}, {self.resolve_url})"
+
+
+class TemplateCache:
+
+    def __init__(self, default_path, basepath="/", dir_templates=None, assets=None):
+        self.default_path = default_path
+        self.basepath = basepath
+        self.assets = assets
+        self.dir_templates = dir_templates if dir_templates else {}
+        self.templates = {}
+
+    def template_path(self, from_path, front_matter=None):
+        if front_matter and front_matter.get("template"):
+            return os.path.join(os.path.dirname(self.default_path), front_matter["template"])
+        if self.dir_templates:
+            dir_path = os.path.dirname(from_path)
+            while dir_path not in self.dir_templates:
+                parent_path = os.path.dirname(dir_path)
+                if parent_path == dir_path:
+                    return self.default_path
+                dir_path = parent_path
+            return self.dir_templates[dir_path]
+        return self.default_path
+
+    def select(self, from_path, front_matter=None):
+        return self.get(self.template_path(from_path, front_matter))
+
+    def get(self, template_path):
+        template = self.templates.get(template_path)
+        if template is None:
+            template = load_template(template_path, self.basepath, self.assets)
+            self.templates[template_path] = template
+        return template
+
+    def __len__(self):
+        return len(self.templates)
+
+    def __repr__(self):
+        return f"TemplateCache({self.default_path}, {self.basepath}, {len(self.dir_templates)} directory templates, {list(self.templates)})"
+
+
+def load_template(template_path, basepath="/", assets=None):
+    with open(template_path) as template_file:
+        return Template(template_file.read(), UrlResolver(basepath, assets), template_path)
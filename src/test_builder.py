@@ -0,0 +1,57 @@
+import unittest
+from builder import Site, RenderedPage
+from content import PageGenerationError
+
+TEMPLATE = "<title>{{ Title }}</title><link href=\"/index.css\">{{ Content }}"
+
+
+class TestSite(unittest.TestCase):
+
+    def setUp(self):
+        self.site = Site(TEMPLATE, "/site/", templates={
+            "blog/_template.html": "<h1>{{ Title }}</h1>{{ Content }}",
+            "draft.html": "<h2>{{ Title }}</h2>",
+        })
+
+    def tearDown(self):
+        self.site.close()
+
+    def test_render(self):
+        self.assertEqual(
+            RenderedPage("index.md", "index.html", "Home",
+                         "<title>Home</title><link href=\"/site/index.css\"><div><h1>Home</h1><p><a href=\"/site/blog\">Blog</a></p></div>"),
+            self.site.render("index.md", "# Home\n\n[Blog](/blog)")
+        )
+
+    def test_directory_and_front_matter_templates(self):
+        self.assertEqual("<h1>Tom</h1><div><h1>Tom</h1></div>", self.site.render("blog/tom/index.md", "# Tom").html)
+        self.assertEqual("<h2>Draft</h2>", self.site.render("blog/draft.md", "---\ntemplate: draft.html\n---\n# Draft").html)
+
+    def test_unknown_templates_fail(self):
+        for template in ["missing.html", "../../../../etc/passwd", "/etc/passwd", "blog/../../template.html"]:
+            page = self.site.try_render(("draft.md", f"---\ntemplate: {template}\n---\n# Hi\n"))
+            self.assertIsNone(page.html, template)
+            self.assertIn("Unknown template", page.error)
+        self.assertEqual(3, len(self.site.templates))
+
+    def test_render_many_keeps_order_and_reports_errors(self):
+        pages = list(self.site.render_many([("a.md", "# A"), ("broken.md", "no title"), ("b.md", "# B")]))
+        self.assertListEqual(["A", None, "B"], [page.title for page in pages])
+        self.assertIn("broken.md", pages[1].error)
+
+    def test_render_many_in_worker_processes(self):
+        sources = {f"page{i}.md": f"# Page {i}\n\n*text* {i}" for i in range(20)}
+        serial = list(self.site.render_many(sources))
+        with Site(TEMPLATE, "/site/", jobs=2) as site:
+            self.assertListEqual(serial, list(site.render_many(sources)))
+
+    def test_build(self):
+        pages = self.site.build({"index.md": "# Home", "blog/index.md": "# Blog"})
+        self.assertEqual(["blog/index.md", "index.md"], sorted(pages))
+        self.assertEqual("blog/index.html", pages["blog/index.md"].dest_path)
+        with self.assertRaises(PageGenerationError):
+            self.site.build({"index.md": "no title"})
+
+
+if __name__ == "__main__":
+    unittest.main()
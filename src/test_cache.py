@@ -0,0 +1,48 @@
+import os
+import unittest
+from fixtures import TempDirMixin
+from cache import PageCache
+from template import UrlResolver
+
+
+class TestPageCache(TempDirMixin, unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.cache = PageCache(os.path.join(self.root, "cache"))
+
+    def test_put_and_get(self):
+        key = self.cache.key("# Title", UrlResolver("/"))
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, "Title", "<div><h1>Title</h1></div>", [("link", "/blog")])
+        self.assertEqual(("Title", "<div><h1>Title</h1></div>", [("link", "/blog")]), self.cache.get(key))
+
+    def test_entries_depend_only_on_referenced_assets(self):
+        resolve_url = UrlResolver("/", {"index.css": "index.1111111111.css", "logo.png": "logo.2222222222.png"})
+        key = self.cache.key("# Title\n\n![Logo](/logo.png)", resolve_url)
+        self.cache.put(key, "Title", "<div></div>", [("image", "/logo.png")], resolve_url)
+        self.assertIsNotNone(self.cache.get(key, UrlResolver("/", {"index.css": "index.3333333333.css", "logo.png": "logo.2222222222.png"})))
+        self.assertIsNone(self.cache.get(key, UrlResolver("/", {"index.css": "index.1111111111.css", "logo.png": "logo.4444444444.png"})))
+        self.assertIsNone(self.cache.get(key, UrlResolver("/")))
+
+    def test_key_depends_on_markdown_and_basepath(self):
+        key = self.cache.key("# Title", UrlResolver("/"))
+        self.assertEqual(key, self.cache.key("# Title", UrlResolver("/")))
+        self.assertNotEqual(key, self.cache.key("# Title!", UrlResolver("/")))
+        self.assertNotEqual(key, self.cache.key("# Title", UrlResolver("/site/")))
+
+    def test_evicts_least_recently_used(self):
+        keys = [self.cache.key(f"# Page {i}") for i in range(3)]
+        for i, key in enumerate(keys):
+            self.cache.put(key, f"Page {i}", "x" * 100)
+            os.utime(self.cache.entry_path(key), ns=(i * 10**9, i * 10**9))
+        self.cache.get(keys[0])
+        self.cache.max_bytes = os.path.getsize(self.cache.entry_path(keys[0])) * 2
+        self.assertEqual(1, self.cache.evict())
+        self.assertIsNone(self.cache.get(keys[1]))
+        self.assertIsNotNone(self.cache.get(keys[0]))
+        self.assertIsNotNone(self.cache.get(keys[2]))
+
+
+if __name__ == "__main__":
+    unittest.main()
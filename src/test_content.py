@@ -0,0 +1,373 @@
+import contextlib
+import io
+import os
+import unittest
+import content
+from fixtures import TempDirMixin
+from cache import PageCache
+from content import generate_pages_recursive, find_pages, sync_dir_content, PageGenerationError
+from profiler import BuildProfile
+from graph import load_graph
+from manifest import hash_bytes
+from siteindex import load_site_index
+
+TEMPLATE = "<title>{{ Title }}</title><link href=\"/index.css\"><main>{{ Content }}</main>"
+
+
+class TestIncrementalBuild(TempDirMixin, unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.dest = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        self.manifest = os.path.join(self.root, ".build", "manifest.json")
+        self.graph = os.path.join(self.root, ".build", "graph.json")
+        self.write(self.template, TEMPLATE)
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nHello")
+        self.write(os.path.join(self.content, "blog", "post", "index.md"), "# Post\n\nText")
+
+    def build(self, basepath="/"):
+        generate_pages_recursive(self.content, self.template, self.dest, basepath, self.manifest, graph_path=self.graph)
+
+    def mark_outputs(self):
+        for _, dest_path in find_pages(self.content, self.dest):
+            self.write(dest_path, "stale marker")
+
+    def test_unchanged_pages_are_skipped(self):
+        self.build()
+        self.mark_outputs()
+        self.build()
+        self.assertEqual("stale marker", self.read(os.path.join(self.dest, "index.html")))
+
+    def test_rewrite_regenerates_unchanged_pages(self):
+        self.build()
+        self.mark_outputs()
+        generate_pages_recursive(self.content, self.template, self.dest, "/", self.manifest, graph_path=self.graph, rewrite=True)
+        self.assertIn("<h1>Home</h1>", self.read(os.path.join(self.dest, "index.html")))
+        self.assertIn("<h1>Post</h1>", self.read(os.path.join(self.dest, "blog", "post", "index.html")))
+
+    def test_changed_source_is_regenerated(self):
+        self.build()
+        self.mark_outputs()
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nChanged")
+        self.build()
+        self.assertIn("<p>Changed</p>", self.read(os.path.join(self.dest, "index.html")))
+        self.assertEqual("stale marker", self.read(os.path.join(self.dest, "blog", "post", "index.html")))
+
+    def test_template_change_invalidates_all_pages(self):
+        self.build()
+        self.mark_outputs()
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        self.build()
+        self.assertTrue(self.read(os.path.join(self.dest, "blog", "post", "index.html")).startswith("<h1>Post</h1>"))
+
+    def test_basepath_change_invalidates_all_pages(self):
+        self.build()
+        self.build("/site/")
+        self.assertIn("href=\"/site/index.css\"", self.read(os.path.join(self.dest, "index.html")))
+
+    def test_deleted_source_output_is_removed(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "post", "index.md"))
+        self.build()
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog")))
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "index.html")))
+
+    def test_parallel_build_matches_serial(self):
+        self.build()
+        serial = [self.read(dest_path) for _, dest_path in find_pages(self.content, self.dest)]
+        generate_pages_recursive(self.content, self.template, self.dest, "/", jobs=2)
+        parallel = [self.read(dest_path) for _, dest_path in find_pages(self.content, self.dest)]
+        self.assertListEqual(serial, parallel)
+
+    def test_errors_report_source_path(self):
+        broken_path = os.path.join(self.content, "broken.md")
+        self.write(broken_path, "No title here")
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output), self.assertRaises(PageGenerationError) as raised:
+            generate_pages_recursive(self.content, self.template, self.dest, "/", jobs=2)
+        self.assertIn(broken_path, output.getvalue())
+        self.assertIn("1 of 3 pages failed", str(raised.exception))
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "index.html")))
+
+    def test_profile_records_phases_and_pages(self):
+        profile = BuildProfile()
+        generate_pages_recursive(self.content, self.template, self.dest, "/", profile=profile)
+        self.assertEqual(2, len(profile.pages))
+        for phase in ["directory walk", "read", "block scanning", "inline parsing", "serialization", "write"]:
+            self.assertIn(phase, profile.phases)
+        self.assertEqual(2, profile.to_json()["pages_rendered"])
+
+    def test_streamed_pages_match_in_memory_pages(self):
+        self.write(os.path.join(self.content, "index.md"), "Intro\n\n# Home\n\n- [a](/a)\n- *b*\n\n> quote\n\n```\ncode\n```\n")
+        self.build()
+        expected = self.read(os.path.join(self.dest, "index.html"))
+        threshold = content.STREAMING_THRESHOLD
+        content.STREAMING_THRESHOLD = 0
+        try:
+            generate_pages_recursive(self.content, self.template, self.dest, "/", self.manifest)
+            self.assertEqual(expected, self.read(os.path.join(self.dest, "index.html")))
+            self.write(os.path.join(self.content, "index.md"), "# Streamed\n")
+            generate_pages_recursive(self.content, self.template, self.dest, "/", self.manifest)
+            self.assertIn("<title>Streamed</title>", self.read(os.path.join(self.dest, "index.html")))
+        finally:
+            content.STREAMING_THRESHOLD = threshold
+
+    def test_crossing_the_streaming_threshold_keeps_pages(self):
+        self.write(os.path.join(self.content, "index.md"), "---\ntitle: Home\n---\n# Home\n\nHello\n")
+        self.build()
+        self.mark_outputs()
+        threshold = content.STREAMING_THRESHOLD
+        content.STREAMING_THRESHOLD = 0
+        try:
+            self.build()
+        finally:
+            content.STREAMING_THRESHOLD = threshold
+        self.assertEqual("stale marker", self.read(os.path.join(self.dest, "index.html")))
+
+    def test_missing_output_is_regenerated(self):
+        self.build()
+        os.remove(os.path.join(self.dest, "index.html"))
+        self.build()
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "index.html")))
+
+    def test_dependency_graph_is_recorded(self):
+        markdown = "# Home\n\n![Tom](/images/tom.png) [Post](blog/post/)"
+        self.write(os.path.join(self.content, "index.md"), markdown)
+        self.build()
+        graph = load_graph(self.graph, self.content, "static")
+        self.assertDictEqual(
+            {"template": [self.template], "assets": [os.path.join("static", "images", "tom.png")],
+             "pages": [os.path.join(self.content, "blog", "post", "index.md")], "markdown": hash_bytes(markdown.encode())},
+            graph.pages[os.path.join(self.content, "index.md")]
+        )
+        os.remove(os.path.join(self.content, "blog", "post", "index.md"))
+        self.build()
+        self.assertListEqual([os.path.join(self.content, "index.md")], list(load_graph(self.graph, self.content, "static").pages))
+
+    def test_page_cache_hits_keep_their_references(self):
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n[Post](blog/post/)")
+        cache = PageCache(os.path.join(self.root, ".build", "cache"))
+        generate_pages_recursive(self.content, self.template, self.dest, "/", self.manifest, cache=cache, graph_path=self.graph)
+        os.remove(self.graph)
+        os.remove(self.manifest)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            generate_pages_recursive(self.content, self.template, self.dest, "/", self.manifest, cache=cache, graph_path=self.graph)
+        self.assertIn("Page cache: 2 hits", output.getvalue())
+        self.assertListEqual([os.path.join(self.content, "blog", "post", "index.md")],
+                             load_graph(self.graph, self.content, "static").pages[os.path.join(self.content, "index.md")]["pages"])
+
+    def test_missing_graph_entries_are_regenerated(self):
+        self.build()
+        self.mark_outputs()
+        os.remove(self.graph)
+        self.build()
+        self.assertIn("<h1>Home</h1>", self.read(os.path.join(self.dest, "index.html")))
+        self.assertEqual(2, len(load_graph(self.graph, self.content, "static").pages))
+
+    def test_directory_and_front_matter_templates(self):
+        self.write(os.path.join(self.content, "blog", "_template.html"), "<h2>{{ Title }}</h2>{{ Content }}")
+        self.write(os.path.join(self.content, "blog", "draft.md"), "---\ntemplate: draft.html\n---\n# Draft")
+        self.write(os.path.join(self.root, "draft.html"), "<h3>{{ Title }}</h3>")
+        self.build()
+        self.assertTrue(self.read(os.path.join(self.dest, "index.html")).startswith("<title>Home</title>"))
+        self.assertTrue(self.read(os.path.join(self.dest, "blog", "post", "index.html")).startswith("<h2>Post</h2>"))
+        self.assertEqual("<h3>Draft</h3>", self.read(os.path.join(self.dest, "blog", "draft.html")))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog", "_template.html")))
+
+    def test_template_change_only_invalidates_its_pages(self):
+        self.write(os.path.join(self.content, "blog", "_template.html"), "<h2>{{ Title }}</h2>{{ Content }}")
+        self.build()
+        self.mark_outputs()
+        self.write(os.path.join(self.content, "blog", "_template.html"), "<h4>{{ Title }}</h4>{{ Content }}")
+        self.build()
+        self.assertTrue(self.read(os.path.join(self.dest, "blog", "post", "index.html")).startswith("<h4>Post</h4>"))
+        self.assertEqual("stale marker", self.read(os.path.join(self.dest, "index.html")))
+
+    def test_missing_front_matter_template_fails_page(self):
+        self.write(os.path.join(self.content, "index.md"), "---\ntemplate: missing.html\n---\n# Home")
+        with self.assertRaises(PageGenerationError):
+            self.build()
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "blog", "post", "index.html")))
+
+    def test_read_page_title_stops_at_first_h1(self):
+        page_path = os.path.join(self.content, "large.md")
+        self.write(page_path, "---\ntemplate: other.html\n---\n# Large\n\n" + "text\n" * 200000)
+        with open(page_path, "ab") as page_file:
+            page_file.write(b"\xff\xfe")
+        self.assertEqual("Large", content.read_page_title(page_path))
+
+    def test_site_index_is_updated_incrementally(self):
+        index_path = os.path.join(self.root, ".build", "index.json")
+        generate_pages_recursive(self.content, self.template, self.dest, "/", self.manifest, index_path=index_path,
+                                 site_url="https://example.com")
+        self.assertIn("<a href=\"/blog/post/\">Post</a>", self.read(os.path.join(self.dest, "blog", "index.html")))
+        self.assertIn("<loc>https://example.com/blog/post/</loc>", self.read(os.path.join(self.dest, "sitemap.xml")))
+        self.write(os.path.join(self.content, "blog", "post", "index.md"), "# Renamed")
+        generate_pages_recursive(self.content, self.template, self.dest, "/", self.manifest, index_path=index_path)
+        self.assertIn("<a href=\"/blog/post/\">Renamed</a>", self.read(os.path.join(self.dest, "blog", "index.html")))
+        self.assertEqual("Home", load_site_index(index_path, self.dest).pages[os.path.join(self.content, "index.md")]["title"])
+
+    def test_site_index_fills_missing_entries_without_rendering(self):
+        self.build()
+        self.mark_outputs()
+        index_path = os.path.join(self.root, ".build", "index.json")
+        generate_pages_recursive(self.content, self.template, self.dest, "/", self.manifest, graph_path=self.graph, index_path=index_path)
+        self.assertEqual("stale marker", self.read(os.path.join(self.dest, "index.html")))
+        self.assertEqual(["Home", "Post"], sorted(entry["title"] for entry in load_site_index(index_path, self.dest).pages.values()))
+
+    def test_site_index_without_manifest(self):
+        index_path = os.path.join(self.root, ".build", "index.json")
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            generate_pages_recursive(self.content, self.template, self.dest, "/", index_path=index_path)
+        self.assertNotIn("Generated", output.getvalue())
+        self.assertEqual(2, len(load_site_index(index_path, self.dest).pages))
+
+    def test_manifest_without_site_index_prints_summary(self):
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            self.build()
+        self.assertIn("Generated 2 pages, skipped 0 unchanged, removed 0 stale.", output.getvalue())
+
+
+class TestSyncDirContent(TempDirMixin, unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.static = os.path.join(self.root, "static")
+        self.dest = os.path.join(self.root, "docs")
+        self.manifest = os.path.join(self.root, ".build", "assets.json")
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.static, "images", "logo.png"), "png")
+        self.write(os.path.join(self.dest, "index.html"), "generated page")
+
+    def test_copies_assets_and_keeps_other_files(self):
+        sync_dir_content(self.static, self.dest, self.manifest)
+        self.assertEqual("png", self.read(os.path.join(self.dest, "images", "logo.png")))
+        self.assertEqual("generated page", self.read(os.path.join(self.dest, "index.html")))
+
+    def test_unchanged_assets_are_not_copied(self):
+        sync_dir_content(self.static, self.dest, self.manifest)
+        self.write(os.path.join(self.dest, "index.css"), "marker")
+        sync_dir_content(self.static, self.dest, self.manifest)
+        self.assertEqual("marker", self.read(os.path.join(self.dest, "index.css")))
+        sync_dir_content(self.static, self.dest, self.manifest, rewrite=True)
+        self.assertNotEqual("marker", self.read(os.path.join(self.dest, "index.css")))
+
+    def test_changed_assets_are_copied_by_hash(self):
+        sync_dir_content(self.static, self.dest, self.manifest, use_hash=True)
+        stat = os.stat(os.path.join(self.static, "index.css"))
+        self.write(os.path.join(self.static, "index.css"), "main {}")
+        os.utime(os.path.join(self.static, "index.css"), ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        sync_dir_content(self.static, self.dest, self.manifest, use_hash=True)
+        self.assertEqual("main {}", self.read(os.path.join(self.dest, "index.css")))
+
+    def test_stale_assets_are_removed(self):
+        sync_dir_content(self.static, self.dest, self.manifest)
+        os.remove(os.path.join(self.static, "images", "logo.png"))
+        sync_dir_content(self.static, self.dest, self.manifest)
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "images")))
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "index.html")))
+
+    def test_fingerprinted_assets(self):
+        assets, changed = sync_dir_content(self.static, self.dest, self.manifest, fingerprint=True)
+        css_name = assets["index.css"]
+        self.assertRegex(css_name, r"^index\.[0-9a-f]{10}\.css$")
+        self.assertEqual(["images/logo.png", "index.css"], sorted(assets))
+        self.assertEqual(["images/logo.png", "index.css"], changed)
+        self.assertEqual("body {}", self.read(os.path.join(self.dest, css_name)))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "index.css")))
+        self.write(os.path.join(self.static, "index.css"), "main {}")
+        assets, changed = sync_dir_content(self.static, self.dest, self.manifest, fingerprint=True)
+        self.assertEqual(["index.css"], changed)
+        self.assertNotEqual(css_name, assets["index.css"])
+        self.assertFalse(os.path.exists(os.path.join(self.dest, css_name)))
+
+    def test_unchanged_assets_are_not_rehashed(self):
+        sync_dir_content(self.static, self.dest, self.manifest, fingerprint=True)
+        hash_file = content.hash_file
+        content.hash_file = None
+        try:
+            _, changed = sync_dir_content(self.static, self.dest, self.manifest, fingerprint=True)
+        finally:
+            content.hash_file = hash_file
+        self.assertEqual([], changed)
+
+    def test_assets_referenced_from_css_keep_their_names(self):
+        self.write(os.path.join(self.static, "fonts", "serif.woff2"), "font")
+        self.write(os.path.join(self.static, "index.css"),
+                   "@import \"print.css\";\nbody { background: url( 'images/logo.png?v=1' ); }\n"
+                   "@font-face { src: url(/site/fonts/serif.woff2); }\na { background: url(data:image/png;base64,AAAA); }")
+        self.write(os.path.join(self.static, "print.css"), "body {}")
+        assets, _ = sync_dir_content(self.static, self.dest, self.manifest, fingerprint=True)
+        self.assertEqual(["index.css"], sorted(assets))
+        self.assertEqual("png", self.read(os.path.join(self.dest, "images", "logo.png")))
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        assets, changed = sync_dir_content(self.static, self.dest, self.manifest, fingerprint=True)
+        self.assertEqual(["fonts/serif.woff2", "images/logo.png", "index.css", "print.css"], changed)
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "images", "logo.png")))
+
+    def test_well_known_names_are_kept(self):
+        self.write(os.path.join(self.static, "robots.txt"), "User-agent: *")
+        assets, _ = sync_dir_content(self.static, self.dest, self.manifest, fingerprint=True)
+        self.assertNotIn("robots.txt", assets)
+        self.assertEqual("User-agent: *", self.read(os.path.join(self.dest, "robots.txt")))
+
+
+class TestFingerprintedBuild(TempDirMixin, unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.static = os.path.join(self.root, "static")
+        self.content = os.path.join(self.root, "content")
+        self.dest = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        self.build_dir = os.path.join(self.root, ".build")
+        self.write(self.template, TEMPLATE)
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.static, "images", "logo.png"), "png")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n![Logo](/images/logo.png)")
+        self.write(os.path.join(self.content, "about.md"), "# About")
+
+    def build(self, cache=None):
+        assets, changed = sync_dir_content(self.static, self.dest, os.path.join(self.build_dir, "assets.json"), fingerprint=True)
+        generate_pages_recursive(self.content, self.template, self.dest, "/", os.path.join(self.build_dir, "manifest.json"),
+                                 cache=cache, graph_path=os.path.join(self.build_dir, "graph.json"), static_dir=self.static,
+                                 assets=assets, changed_assets=changed)
+        return assets
+
+    def test_references_are_rewritten(self):
+        assets = self.build()
+        page = self.read(os.path.join(self.dest, "index.html"))
+        self.assertIn(f"href=\"/{assets['index.css']}\"", page)
+        self.assertIn(f"src=\"/{assets['images/logo.png']}\"", page)
+
+    def test_changed_asset_rebuilds_only_its_pages(self):
+        self.build()
+        self.write(os.path.join(self.dest, "about.html"), "marker")
+        self.write(os.path.join(self.static, "images", "logo.png"), "new png")
+        assets = self.build()
+        self.assertIn(f"src=\"/{assets['images/logo.png']}\"", self.read(os.path.join(self.dest, "index.html")))
+        self.assertEqual("marker", self.read(os.path.join(self.dest, "about.html")))
+
+    def test_changed_stylesheet_keeps_cached_bodies(self):
+        cache = PageCache(os.path.join(self.build_dir, "cache"))
+        self.build(cache)
+        self.write(os.path.join(self.static, "index.css"), "main {}")
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            assets = self.build(cache)
+        self.assertIn("Generated 2 pages", output.getvalue())
+        self.assertIn("Page cache: 2 hits, 0 misses", output.getvalue())
+        self.assertIn(f"href=\"/{assets['index.css']}\"", self.read(os.path.join(self.dest, "about.html")))
+        self.write(os.path.join(self.static, "images", "logo.png"), "new png")
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            assets = self.build(cache)
+        self.assertIn("Page cache: 0 hits, 1 misses", output.getvalue())
+        self.assertIn(f"src=\"/{assets['images/logo.png']}\"", self.read(os.path.join(self.dest, "index.html")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import socket
+import sys
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from fixtures import TempDirMixin
+from builder import Site
+from markdown import inline_memo
+from daemon import HEADER, RenderClient, RenderDaemon, SocketInUseError, start_daemon, receive_message
+
+
+class TestRenderDaemon(TempDirMixin, unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.socket_path = os.path.join(self.root, "render.sock")
+        self.daemon = start_daemon(self.socket_path, Site("<title>{{ Title }}</title>{{ Content }}", "/site/"))
+
+    def tearDown(self):
+        self.daemon.shutdown()
+        self.daemon.server_close()
+
+    def test_render(self):
+        with RenderClient(self.socket_path) as client:
+            self.assertTrue(client.ping())
+            self.assertEqual("<title>Home</title><div><h1>Home</h1><p><a href=\"/site/\">x</a></p></div>",
+                             client.render("# Home\n\n[x](/)"))
+            self.assertEqual("<title>Again</title><div><h1>Again</h1></div>", client.render("# Again"))
+
+    def test_concurrent_clients(self):
+        # A small memo makes the request threads evict each other's entries all the time.
+        max_entries = inline_memo.max_entries
+        inline_memo.resize(4)
+        self.addCleanup(inline_memo.resize, max_entries)
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        self.addCleanup(sys.setswitchinterval, switch_interval)
+
+        def render_pages(client_id):
+            with RenderClient(self.socket_path) as client:
+                return [client.render(f"# Page {(client_id + i) % 7}\n\n" + "\n\n".join(f"para {(client_id + i + j) % 7} *x*" for j in range(50)))
+                        for i in range(25)]
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(render_pages, range(8)))
+        self.assertEqual(25 * 8, sum(len(pages) for pages in results))
+        self.assertEqual(results[0][1], results[1][0])
+
+    def test_render_error_keeps_connection(self):
+        with RenderClient(self.socket_path) as client:
+            with self.assertRaises(RuntimeError):
+                client.render("no title")
+            self.assertTrue(client.ping())
+
+    def test_oversized_message_is_rejected(self):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(self.socket_path)
+            sock.sendall(HEADER.pack(1 << 31))
+            self.assertFalse(receive_message(sock)["ok"])
+
+    def test_running_daemon_socket_is_kept(self):
+        with self.assertRaises(SocketInUseError):
+            RenderDaemon(self.socket_path, Site())
+        with RenderClient(self.socket_path) as client:
+            self.assertTrue(client.ping())
+
+    def test_stale_socket_is_replaced(self):
+        self.daemon.shutdown()
+        self.daemon.server_close()
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.bind(self.socket_path)
+        self.daemon = start_daemon(self.socket_path, Site())
+        with RenderClient(self.socket_path) as client:
+            self.assertTrue(client.ping())
+
+    def test_other_files_are_not_replaced(self):
+        path = os.path.join(self.root, "notes.txt")
+        with open(path, "w") as notes_file:
+            notes_file.write("keep")
+        with self.assertRaises(SocketInUseError):
+            RenderDaemon(path, Site())
+        with open(path) as notes_file:
+            self.assertEqual("keep", notes_file.read())
+
+    def test_socket_is_removed_on_close(self):
+        self.daemon.shutdown()
+        self.daemon.server_close()
+        self.assertFalse(os.path.exists(self.socket_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
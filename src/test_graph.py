@@ -0,0 +1,112 @@
+import os
+import tempfile
+import unittest
+from graph import BuildGraph, load_graph, resolve_reference
+
+
+class TestResolveReference(unittest.TestCase):
+
+    def test_images_are_assets(self):
+        self.assertEqual(
+            ("assets", os.path.join("static", "images", "tom.png")),
+            resolve_reference("image", "/images/tom.png", os.path.join("content", "index.md"), "content", "static"),
+        )
+
+    def test_relative_links(self):
+        self.assertEqual(
+            ("pages", os.path.join("content", "blog", "tom", "index.md")),
+            resolve_reference("link", "../tom/", os.path.join("content", "blog", "majesty", "index.md"), "content", "static"),
+        )
+
+    def test_root_and_html_links(self):
+        self.assertEqual(("pages", os.path.join("content", "index.md")),
+                         resolve_reference("link", "/", os.path.join("content", "blog", "index.md"), "content", "static"))
+        self.assertEqual(("pages", os.path.join("content", "about.md")),
+                         resolve_reference("link", "/about.html#team", os.path.join("content", "index.md"), "content", "static"))
+
+    def test_linked_files_are_assets(self):
+        self.assertEqual(("assets", os.path.join("static", "notes.pdf")),
+                         resolve_reference("link", "/notes.pdf", os.path.join("content", "index.md"), "content", "static"))
+
+    def test_external_links_are_ignored(self):
+        for url in ["https://www.boot.dev", "//cdn.example.com/a.png", "mailto:me@example.com", "#top", "/../outside"]:
+            self.assertIsNone(resolve_reference("link", url, os.path.join("content", "index.md"), "content", "static"), url)
+
+
+class TestBuildGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = BuildGraph("content", "static")
+        self.graph.record(os.path.join("content", "index.md"), "template.html",
+                          [("image", "/images/tom.png"), ("link", "/blog/tom"), ("link", "https://www.boot.dev")])
+        self.graph.record(os.path.join("content", "blog", "tom", "index.md"), "./template.html", [("link", "/")])
+
+    def test_record(self):
+        self.assertDictEqual(
+            {
+                "template": ["template.html"],
+                "assets": [os.path.join("static", "images", "tom.png")],
+                "pages": [os.path.join("content", "blog", "tom", "index.md")],
+            },
+            self.graph.pages[os.path.join("content", "index.md")],
+        )
+
+    def test_page_is_not_its_own_dependent(self):
+        self.graph.record(os.path.join(".", "content", "blog", "index.md"), "template.html", [("link", "./"), ("link", "/blog/")])
+        self.assertDictEqual({"template": ["template.html"], "assets": [], "pages": []},
+                             self.graph.pages[os.path.join("content", "blog", "index.md")])
+        self.graph.remove(os.path.join("content", "blog", "", "index.md"))
+        self.assertNotIn(os.path.join("content", "blog", "index.md"), self.graph.pages)
+
+    def test_unchanged_source_keeps_its_edges(self):
+        self.graph.record(os.path.join("content", "about.md"), "template.html", [("link", "/blog/tom")], "a1")
+        self.graph.record(os.path.join("content", "about.md"), "post.html", [("link", "/other")], "a1")
+        self.assertDictEqual({"template": ["post.html"], "assets": [], "pages": [os.path.join("content", "blog", "tom", "index.md")],
+                              "markdown": "a1"}, self.graph.pages[os.path.join("content", "about.md")])
+        self.graph.record(os.path.join("content", "about.md"), "post.html", [("link", "/other")], "b2")
+        self.assertListEqual([os.path.join("content", "other", "index.md")], self.graph.pages[os.path.join("content", "about.md")]["pages"])
+
+    def test_known_pages_resolve_without_the_filesystem(self):
+        self.assertEqual(("pages", os.path.join("content", "about.md")),
+                         resolve_reference("link", "/about", os.path.join("content", "index.md"), "content", "static",
+                                           {os.path.join("content", "about.md")}))
+        self.assertEqual(("pages", os.path.join("content", "about", "index.md")),
+                         resolve_reference("link", "/about", os.path.join("content", "index.md"), "content", "static", set()))
+
+    def test_known_pages_resolve_relative_links_per_directory(self):
+        graph = BuildGraph("content", "static")
+        graph.use_pages({os.path.join("content", "a", "x.md"), os.path.join("content", "b", "x.md")})
+        graph.record(os.path.join("content", "a", "index.md"), "template.html", [("link", "x"), ("link", "/a/x")])
+        graph.record(os.path.join("content", "b", "index.md"), "template.html", [("link", "x"), ("link", "/a/x")])
+        self.assertListEqual([os.path.join("content", "a", "x.md")], graph.pages[os.path.join("content", "a", "index.md")]["pages"])
+        self.assertListEqual([os.path.join("content", "a", "x.md"), os.path.join("content", "b", "x.md")],
+                             graph.pages[os.path.join("content", "b", "index.md")]["pages"])
+
+    def test_dependents(self):
+        self.assertListEqual(
+            [(os.path.join("content", "blog", "tom", "index.md"), "template"), (os.path.join("content", "index.md"), "template")],
+            self.graph.dependents("template.html"),
+        )
+        self.assertListEqual([(os.path.join("content", "index.md"), "assets")],
+                             self.graph.dependents(os.path.join("static", "images", "tom.png")))
+        self.assertListEqual([], self.graph.dependents(os.path.join("static", "index.css")))
+
+    def test_rebuild_set(self):
+        self.assertListEqual([os.path.join("content", "blog", "tom", "index.md"), os.path.join("content", "index.md")],
+                             self.graph.rebuild_set(["template.html"]))
+        self.assertListEqual([os.path.join("content", "blog", "tom", "index.md")],
+                             self.graph.rebuild_set([os.path.join("content", "blog", "tom", "index.md")]))
+        self.assertListEqual([os.path.join("content", "new.md")], self.graph.rebuild_set([os.path.join("content", "new.md")]))
+        self.assertListEqual([], self.graph.rebuild_set([os.path.join("static", "images", "tom.png")]))
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            graph_path = os.path.join(tmp, ".build", "graph.json")
+            self.graph.save(graph_path)
+            self.assertEqual(self.graph, load_graph(graph_path, "content", "static"))
+            self.assertEqual({}, load_graph(graph_path, "pages", "static").pages)
+            self.assertEqual({}, load_graph(os.path.join(tmp, "missing.json"), "content", "static").pages)
+
+
+if __name__ == "__main__":
+    unittest.main()
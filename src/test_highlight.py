@@ -0,0 +1,64 @@
+import os
+import unittest
+from cache import PageCache
+from fixtures import TempDirMixin
+from highlight import LEXERS, highlight, highlight_memo, use_highlight_store
+from manifest import hash_bytes
+
+
+class TestLexers(unittest.TestCase):
+
+    def test_python_tokens(self):
+        self.assertListEqual(
+            [("keyword", "def"), (None, " f(x):  "), ("comment", "# hi"), (None, "\n    "), ("keyword", "return"),
+             (None, " "), ("builtin", "len"), (None, "("), ("string", "'a'"), (None, ") + "), ("number", "1")],
+            list(LEXERS["python"].tokens("def f(x):  # hi\n    return len('a') + 1"))
+        )
+
+    def test_keywords_ignore_case_for_sql(self):
+        self.assertEqual([("keyword", "select"), (None, " "), ("builtin", "COUNT")],
+                         list(LEXERS["sql"].tokens("select COUNT"))[:3])
+
+    def test_tokens_cover_the_code(self):
+        code = '<a href="/x">Tom & "Jerry"</a>\n<!-- note -->'
+        for lexer in set(LEXERS.values()):
+            self.assertEqual(code, "".join(text for _, text in lexer.tokens(code)), lexer)
+
+
+class TestHighlight(unittest.TestCase):
+
+    def test_classed_and_escaped_spans(self):
+        self.assertEqual(
+            '<span class="hl-keyword">const</span> a = <span class="hl-string">"&lt;b&gt;"</span>;',
+            highlight("js", 'const a = "<b>";')
+        )
+
+    def test_unknown_language(self):
+        self.assertIsNone(highlight("brainfuck", "+++"))
+
+    def test_aliases_share_the_memo(self):
+        code = "x = 1  # memo test\n"
+        hits, misses = highlight_memo.counters()
+        self.assertEqual(highlight("python", code), highlight("py", code))
+        self.assertEqual((hits + 1, misses + 1), highlight_memo.counters())
+
+
+class TestHighlightStore(TempDirMixin, unittest.TestCase):
+
+    def test_snippets_outlive_the_memo(self):
+        cache = PageCache(os.path.join(self.root, "cache"))
+        use_highlight_store(cache)
+        self.addCleanup(use_highlight_store, None)
+        code = "x = 2  # store test\n"
+        html = highlight("python", code)
+        max_entries = highlight_memo.max_entries
+        highlight_memo.resize(0)
+        self.addCleanup(highlight_memo.resize, max_entries)
+        key = cache.snippet_key("python", hash_bytes(code.encode()))
+        self.assertEqual(html, cache.get_snippet(key))
+        cache.put_snippet(key, "<stored>")
+        self.assertEqual("<stored>", highlight("py", code))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
+import io
 import unittest
 from htmlnode import HTMLNode
 from htmlnode import LeafNode
@@ -118,5 +119,18 @@ class TestParentNode(unittest.TestCase):
         self.assertEqual('<div><p><b>Bold text</b>Normal text<i>italic text</i>Normal text</p></div>', node.to_html())
 
 
+    def test_iter_html(self):
+        node = ParentNode("div", [ParentNode("p", self.multiple_leaves_children), LeafNode(None, "tail")])
+        fragments = list(node.iter_html())
+        self.assertEqual("<div>", fragments[0])
+        self.assertEqual(node.to_html(), "".join(fragments))
+
+    def test_write_html(self):
+        node = ParentNode("div", [ParentNode("p", self.multiple_leaves_children)])
+        file = io.StringIO()
+        node.write_html(file)
+        self.assertEqual(node.to_html(), file.getvalue())
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
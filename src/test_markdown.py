@@ -3,8 +3,17 @@ from markdown import (
     markdown_to_blocks,
     block_to_block_type,
     markdown_to_html_node,
+    blocks_to_html_node,
     extract_title,
-    BlockType
+    scan_title,
+    extract_references_from_blocks,
+    scan_markdown,
+    scan_blocks,
+    split_front_matter,
+    split_front_matter_lines,
+    Block,
+    BlockType,
+    inline_memo
 )
 
 class TestMarkdownToBlocks(unittest.TestCase):
@@ -38,6 +47,30 @@ class TestMarkdownToBlocks(unittest.TestCase):
         )
 
 
+class TestScanBlocks(unittest.TestCase):
+
+    def test_typed_blocks_with_line_spans(self):
+        lines = ["  ## Heading  ", "", "- one", "- two", " \t", "", "1. first", "2. second  ", "", "```", "code", "```"]
+        self.assertListEqual(
+            [
+                Block(BlockType.HEADING, "## Heading", 2, 1, 1),
+                Block(BlockType.UNORDERED_LIST, "- one\n- two", 0, 3, 4),
+                Block(BlockType.ORDERED_LIST, "1. first\n2. second", 0, 7, 8),
+                Block(BlockType.CODE, "```\ncode\n```", 0, 10, 12),
+            ],
+            list(scan_blocks(lines))
+        )
+
+    def test_lines_with_newlines(self):
+        self.assertListEqual(
+            [Block(BlockType.QUOTE, ">a\n>b", 0, 1, 2), Block(BlockType.PARAGRAPH, "text", 0, 4, 4)],
+            list(scan_blocks([">a\n", ">b\n", "\n", "text\n"]))
+        )
+
+    def test_heading_level_is_capped(self):
+        self.assertEqual(6, next(scan_blocks(["######## deep"])).level)
+
+
 class TestBlockToBlockType(unittest.TestCase):
 
     def test_heading(self):
@@ -112,6 +145,32 @@ the **same** even with inline stuff
             "<div><pre><code>This is text that _should_ remain\nthe **same** even with inline stuff\n</code></pre></div>",
         )
 
+    def test_codeblock_with_language(self):
+        md = "```Python\nprint('<b>')\n```"
+        self.assertEqual(
+            "<div><pre><code class=\"language-python\"><span class=\"hl-builtin\">print</span>("
+            "<span class=\"hl-string\">'&lt;b&gt;'</span>)\n</code></pre></div>",
+            markdown_to_html_node(md).to_html(),
+        )
+
+    def test_codeblock_with_unknown_language(self):
+        md = "```brainfuck\n+++\n```"
+        self.assertEqual(
+            "<div><pre><code class=\"language-brainfuck\">+++\n</code></pre></div>",
+            markdown_to_html_node(md).to_html(),
+        )
+
+    def test_codeblocks_escape_alike(self):
+        code = "<b>a &amp; b</b>\n"
+        for md, expected in [
+            (f"```\n{code}```", "<code>\n&lt;b&gt;a &amp;amp; b&lt;/b&gt;\n</code>"),
+            (f"```foo\n{code}```", "<code class=\"language-foo\">&lt;b&gt;a &amp;amp; b&lt;/b&gt;\n</code>"),
+            (f"```html\n{code}```", "<code class=\"language-html\"><span class=\"hl-tag\">&lt;b</span>"
+                                    "<span class=\"hl-tag\">&gt;</span>a &amp;amp; b<span class=\"hl-tag\">&lt;/b</span>"
+                                    "<span class=\"hl-tag\">&gt;</span>\n</code>"),
+        ]:
+            self.assertEqual(f"<div><pre>{expected}</pre></div>", markdown_to_html_node(md).to_html())
+
     def test_headings(self):
         md = "### This is h3 heading"
         node = markdown_to_html_node(md)
@@ -178,5 +237,75 @@ class TestExtractTitle(unittest.TestCase):
             markdown = "Heading 1"
             extract_title(markdown)
 
+
+class TestScanTitle(unittest.TestCase):
+
+    def test_matches_extract_title(self):
+        for markdown in ["# Heading 1", "Intro\n\n  # Heading 1  \n\nText", "## Sub\n\n# Title\nmore\n\n# Second"]:
+            self.assertEqual(extract_title(markdown), scan_title(markdown.split("\n")))
+
+    def test_stops_at_first_h1(self):
+        def lines():
+            yield "# Title\n"
+            yield "\n"
+            raise AssertionError("read past the title block")
+        self.assertEqual("Title", scan_title(lines()))
+
+    def test_invalid(self):
+        with self.assertRaises(Exception):
+            scan_title(["## Heading 1", "", "Text # Heading"])
+
+
+class TestExtractReferences(unittest.TestCase):
+
+    def test_images_and_links_outside_code(self):
+        md = "# [Home](/)\n\n![Tom](/images/tom.png) and *[italic](/italic)*\n\n```\n[code](/code)\n```\n\n- [a](/a)\n- [b](/b)\n\n> [quote](/q)"
+        self.assertListEqual(
+            [("link", "/"), ("image", "/images/tom.png"), ("link", "/italic"), ("link", "/a"), ("link", "/b"), ("link", "/q")],
+            extract_references_from_blocks(scan_markdown(md))
+        )
+
+    def test_rendering_collects_the_same_references(self):
+        md = "# [Home](/)\n\n![Tom](/images/tom.png) and [Home](/)\n\n```\n[code](/code)\n```\n\n1. [a](/a)\n2. ![b](b.png)"
+        references = []
+        blocks_to_html_node(scan_markdown(md), references=references)
+        self.assertListEqual(extract_references_from_blocks(scan_markdown(md)), references)
+        # Rendered again from the inline memo.
+        references = []
+        blocks_to_html_node(scan_markdown(md), references=references)
+        self.assertListEqual(extract_references_from_blocks(scan_markdown(md)), references)
+
+
+class TestFrontMatter(unittest.TestCase):
+
+    def test_split(self):
+        self.assertEqual(({"template": "post.html", "draft": "no"}, "# Title\n"),
+                         split_front_matter("---\ntemplate: post.html\ndraft : no\n---\n# Title\n"))
+
+    def test_without_front_matter(self):
+        for markdown in ["# Title", "---", "---\ntemplate: post.html\n# Title", ""]:
+            self.assertEqual(({}, markdown), split_front_matter(markdown))
+
+    def test_lines_match_string(self):
+        for markdown in ["---\ntemplate: a.html\n---\n# T\n\ntext", "---\n---\n# T", "---\na: b\n---", "---\na: b\n# T", "# T\n---", ""]:
+            front_matter, body = split_front_matter(markdown)
+            lines_front_matter, lines = split_front_matter_lines(markdown.splitlines(keepends=True))
+            self.assertEqual((front_matter, body), (lines_front_matter, "".join(lines)), markdown)
+
+
+class TestInlineMemo(unittest.TestCase):
+
+    def test_repeated_fragments_hit_the_memo(self):
+        hits, misses = inline_memo.counters()
+        md = "- [Home](/)\n- [Blog](/blog)\n\n- [Home](/)\n- [Blog](/blog)"
+        self.assertEqual(
+            "<div><ul><li><a href=\"/\">Home</a></li><li><a href=\"/blog\">Blog</a></li></ul>"
+            "<ul><li><a href=\"/\">Home</a></li><li><a href=\"/blog\">Blog</a></li></ul></div>",
+            markdown_to_html_node(md).to_html()
+        )
+        self.assertGreaterEqual(inline_memo.hits - hits, 2)
+        self.assertLessEqual(inline_memo.misses - misses, 2)
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,30 @@
+import unittest
+from memo import LruMemo
+
+
+class TestLruMemo(unittest.TestCase):
+
+    def test_hits_and_misses(self):
+        memo = LruMemo(2)
+        self.assertEqual("A", memo.lookup("a", "a", lambda: "A"))
+        self.assertEqual("A", memo.lookup("a", "a", lambda: "other"))
+        self.assertEqual((1, 1), memo.counters())
+
+    def test_evicts_least_recently_used(self):
+        memo = LruMemo(2)
+        memo.lookup("a", "a", lambda: "A")
+        memo.lookup("b", "b", lambda: "B")
+        memo.lookup("a", "a", lambda: "A")
+        memo.lookup("c", "c", lambda: "C")
+        self.assertListEqual(["a", "c"], list(memo.entries))
+
+    def test_long_texts_and_disabled_memo_are_not_stored(self):
+        memo = LruMemo(2, max_key_length=3)
+        memo.lookup("long", "long", lambda: "L")
+        memo.resize(0)
+        memo.lookup("a", "a", lambda: "A")
+        self.assertEqual(0, len(memo.entries))
+
+
+if __name__ == "__main__":
+    unittest.main()
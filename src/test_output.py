@@ -0,0 +1,63 @@
+import gzip
+import os
+import unittest
+from fixtures import TempDirMixin
+from output import minify_css, minify_html, optimize_output, was_minified
+
+
+class TestMinify(unittest.TestCase):
+
+    def test_html_keeps_pre_and_inline_spaces(self):
+        html = "<html>\n  <head>\n    <title>T</title>\n  </head>\n  <body>\n    <!-- note -->\n    <p>a <b>b</b>\n  c</p>\n<pre><code>\n  x = 1\n</code></pre>\n  </body>\n</html>\n"
+        self.assertEqual(
+            "<html><head><title>T</title></head><body><p>a <b>b</b> c</p><pre><code>\n  x = 1\n</code></pre></body></html>",
+            minify_html(html)
+        )
+
+    def test_html_minifies_style_elements(self):
+        self.assertEqual("<head><style>p{margin:0}</style></head>", minify_html("<head>\n<style>\n  p { margin: 0; }\n</style>\n</head>"))
+
+    def test_css_keeps_strings_and_descendant_pseudo_classes(self):
+        css = "/* header */\nh1 ,\nh2  >  a :hover {\n  content: \"a ; }  b\";\n  margin: 0 auto;\n}\n"
+        self.assertEqual('h1,h2>a :hover{content:"a ; }  b";margin:0 auto}', minify_css(css))
+
+
+class TestOptimizeOutput(TempDirMixin, unittest.TestCase):
+
+    def test_compresses_only_changed_files(self):
+        dest_dir = os.path.join(self.root, "docs")
+        manifest_path = os.path.join(self.root, "output.json")
+        os.makedirs(os.path.join(dest_dir, "blog"))
+        self.write(os.path.join(dest_dir, "index.html"), "<html>\n  <body>\n" + "<p>Tolkien</p>\n" * 50 + "</body></html>")
+        self.write(os.path.join(dest_dir, "blog", "index.css"), "p {\n  color: red;\n}\n" * 50)
+        self.write(os.path.join(dest_dir, "logo.png"), "not text")
+        self.assertFalse(was_minified(manifest_path, dest_dir))
+        self.assertEqual(0, optimize_output(dest_dir, manifest_path, use_minify=True, precompress=True))
+        self.assertTrue(was_minified(manifest_path, dest_dir))
+        sidecar_path = os.path.join(dest_dir, "index.html.gz")
+        with open(os.path.join(dest_dir, "index.html"), "rb") as output_file:
+            html = output_file.read()
+        self.assertTrue(html.startswith(b"<html><body><p>Tolkien</p><p>"))
+        self.assertEqual(html, gzip.decompress(open(sidecar_path, "rb").read()))
+        self.assertTrue(os.path.isfile(os.path.join(dest_dir, "blog", "index.css.gz")))
+        self.assertFalse(os.path.exists(os.path.join(dest_dir, "logo.png.gz")))
+
+        # A rewrite with the same content keeps the sidecar, a new content replaces it.
+        sidecar_mtime = os.stat(sidecar_path).st_mtime_ns
+        self.write(os.path.join(dest_dir, "index.html"), "<html>\n  <body>\n" + "<p>Tolkien</p>\n" * 50 + "</body></html>")
+        optimize_output(dest_dir, manifest_path, use_minify=True, precompress=True)
+        self.assertEqual(sidecar_mtime, os.stat(sidecar_path).st_mtime_ns)
+        self.write(os.path.join(dest_dir, "index.html"), "<html><body>" + "<p>Bombadil</p>" * 50 + "</body></html>")
+        optimize_output(dest_dir, manifest_path, use_minify=True, precompress=True)
+        self.assertIn(b"Bombadil", gzip.decompress(open(sidecar_path, "rb").read()))
+
+        os.remove(os.path.join(dest_dir, "blog", "index.css"))
+        optimize_output(dest_dir, manifest_path, use_minify=True, precompress=True)
+        self.assertFalse(os.path.exists(os.path.join(dest_dir, "blog", "index.css.gz")))
+        optimize_output(dest_dir, manifest_path)
+        self.assertFalse(was_minified(manifest_path, dest_dir))
+        self.assertFalse(os.path.exists(sidecar_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import os
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from fixtures import TempDirMixin
+from pipeline import PageWriter, bounded_map, process_pool, write_file
+
+
+class TestBoundedMap(unittest.TestCase):
+
+    def test_preserves_order(self):
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            self.assertEqual([x * 2 for x in range(100)], list(bounded_map(executor, lambda x: x * 2, range(100), limit=3)))
+
+    def test_empty(self):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            self.assertEqual([], list(bounded_map(executor, str, [])))
+
+    def test_process_pool_does_not_fork_running_threads(self):
+        writer = PageWriter()
+        self.addCleanup(writer.close)
+        with process_pool(2) as pool:
+            self.assertEqual([1, 2, 3], list(bounded_map(pool, abs, [-1, -2, -3])))
+            self.assertNotEqual("fork", pool._mp_context.get_start_method())
+
+
+class TestPageWriter(TempDirMixin, unittest.TestCase):
+
+    def test_writes_pages(self):
+        writer = PageWriter(queue_size=2)
+        for i in range(10):
+            writer.put(f"{i}.md", os.path.join(self.root, "nested", f"{i}.html"), iter(["<p>", str(i), "</p>"]))
+        writer.close()
+        self.assertEqual(10, writer.written)
+        self.assertEqual([], writer.errors)
+        self.assertEqual("<p>7</p>", self.read(os.path.join(self.root, "nested", "7.html")))
+        self.assertFalse([name for name in os.listdir(os.path.join(self.root, "nested")) if name.endswith(".tmp")])
+
+    def test_collects_errors(self):
+        blocker = os.path.join(self.root, "blocker")
+        self.write(blocker, "")
+        writer = PageWriter()
+        writer.put("a.md", os.path.join(blocker, "a.html"), ["<p>a</p>"])
+        writer.put("b.md", os.path.join(self.root, "b.html"), ["<p>b</p>"])
+        writer.close()
+        self.assertEqual(1, writer.written)
+        self.assertEqual(["a.md"], [from_path for from_path, error in writer.errors])
+
+
+class TestWriteFile(TempDirMixin, unittest.TestCase):
+
+    def test_writes_chunks(self):
+        dest_path = os.path.join(self.root, "page.html")
+        write_file(dest_path, iter(["<html>", "</html>"]))
+        self.assertEqual("<html></html>", self.read(dest_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
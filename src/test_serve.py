@@ -0,0 +1,105 @@
+import os
+import unittest
+from fixtures import TempDirMixin
+from content import generate_pages_recursive
+from serve import SiteWatcher, snapshot, changed_paths
+
+
+class TestSiteWatcher(TempDirMixin, unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.static = os.path.join(self.root, "static")
+        self.dest = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog")
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.watcher = SiteWatcher(self.static, self.content, self.template, self.dest, "/",
+                                   os.path.join(self.root, ".build", "manifest.json"), os.path.join(self.root, ".build", "assets.json"))
+        self.watcher.build()
+
+    def test_changed_paths(self):
+        before = snapshot(self.watcher.watched_paths())
+        self.write(os.path.join(self.content, "index.md"), "# Home page")
+        os.remove(os.path.join(self.static, "index.css"))
+        self.assertListEqual(
+            [os.path.join(self.content, "index.md"), os.path.join(self.static, "index.css")],
+            changed_paths(before, snapshot(self.watcher.watched_paths()))
+        )
+
+    def test_failed_rebuild_is_retried(self):
+        before = snapshot(self.watcher.watched_paths())
+        self.write(os.path.join(self.content, "index.md"), "# Home page")
+        rebuild = self.watcher.rebuild
+        attempts = []
+
+        def failing_rebuild(paths):
+            attempts.append(paths)
+            if len(attempts) == 1:
+                raise OSError("half-saved file")
+            rebuild(paths)
+
+        self.watcher.rebuild = failing_rebuild
+        self.assertIs(before, self.watcher.poll(before))
+        after = self.watcher.poll(before)
+        self.assertListEqual([[os.path.join(self.content, "index.md")]] * 2, attempts)
+        self.assertIn("<title>Home page</title>", self.read(os.path.join(self.dest, "index.html")))
+        self.assertIs(after, self.watcher.poll(after))
+        self.assertEqual(2, len(attempts))
+
+    def test_rebuild_only_changed_page(self):
+        self.write(os.path.join(self.dest, "blog", "index.html"), "marker")
+        self.write(os.path.join(self.content, "index.md"), "# Home page")
+        self.watcher.rebuild([os.path.join(self.content, "index.md")])
+        self.assertIn("<title>Home page</title>", self.read(os.path.join(self.dest, "index.html")))
+        self.assertEqual("marker", self.read(os.path.join(self.dest, "blog", "index.html")))
+
+    def test_rebuild_removes_deleted_page(self):
+        os.remove(os.path.join(self.content, "blog", "index.md"))
+        self.watcher.rebuild([os.path.join(self.content, "blog", "index.md")])
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog")))
+
+    def test_template_change_rebuilds_all_pages(self):
+        self.write(self.template, "<h1>{{ Title }}</h1>")
+        self.watcher.rebuild([self.template])
+        self.assertEqual("<h1>Blog</h1>", self.read(os.path.join(self.dest, "blog", "index.html")))
+
+    def test_asset_change_does_not_rebuild_pages(self):
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n![Logo](/logo.png)")
+        self.watcher.rebuild([os.path.join(self.content, "index.md")])
+        self.write(os.path.join(self.dest, "index.html"), "marker")
+        self.write(os.path.join(self.static, "logo.png"), "png")
+        self.watcher.rebuild([os.path.join(self.static, "logo.png")])
+        self.assertEqual("marker", self.read(os.path.join(self.dest, "index.html")))
+        self.assertEqual("png", self.read(os.path.join(self.dest, "logo.png")))
+        self.assertListEqual([(os.path.join(self.content, "index.md"), "assets")],
+                             self.watcher.graph.dependents(os.path.join(self.static, "logo.png")))
+
+    def test_new_directory_template_rebuilds_its_pages(self):
+        self.write(os.path.join(self.dest, "index.html"), "marker")
+        self.write(os.path.join(self.content, "blog", "_template.html"), "<h2>{{ Title }}</h2>")
+        self.watcher.rebuild([os.path.join(self.content, "blog", "_template.html")])
+        self.assertEqual("<h2>Blog</h2>", self.read(os.path.join(self.dest, "blog", "index.html")))
+        self.assertEqual("marker", self.read(os.path.join(self.dest, "index.html")))
+        self.write(os.path.join(self.content, "blog", "_template.html"), "<h3>{{ Title }}</h3>")
+        self.watcher.rebuild([os.path.join(self.content, "blog", "_template.html")])
+        self.assertEqual("<h3>Blog</h3>", self.read(os.path.join(self.dest, "blog", "index.html")))
+
+    def test_rebuild_updates_site_index(self):
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "sitemap.xml")))
+        generate_pages_recursive(self.content, self.template, self.dest, "/", self.watcher.manifest_path,
+                                 index_path=self.watcher.index_path, site_url="https://example.com")
+        self.watcher.build()
+        self.write(os.path.join(self.content, "blog", "news.md"), "# News")
+        self.watcher.rebuild([os.path.join(self.content, "blog", "news.md")])
+        self.assertIn("<loc>https://example.com/blog/news.html</loc>", self.read(os.path.join(self.dest, "sitemap.xml")))
+        os.remove(os.path.join(self.content, "blog", "news.md"))
+        self.watcher.rebuild([os.path.join(self.content, "blog", "news.md")])
+        self.assertNotIn("news", self.read(os.path.join(self.dest, "sitemap.xml")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import unittest
+from fixtures import TempDirMixin
+from siteindex import SiteIndex, load_site_index, page_url, parent_url, listing_title
+from template import TemplateCache
+
+
+class TestUrls(unittest.TestCase):
+    def test_page_url(self):
+        self.assertEqual("/", page_url(os.path.join("docs", "index.html"), "docs"))
+        self.assertEqual("/blog/tom/", page_url(os.path.join("docs", "blog", "tom", "index.html"), "docs"))
+        self.assertEqual("/blog/about.html", page_url(os.path.join("docs", "blog", "about.html"), "docs"))
+
+    def test_parent_url(self):
+        self.assertIsNone(parent_url("/"))
+        self.assertEqual("/", parent_url("/contact/"))
+        self.assertEqual("/blog/", parent_url("/blog/tom/"))
+        self.assertEqual("/blog/", parent_url("/blog/about.html"))
+
+    def test_listing_title(self):
+        self.assertEqual("Blog", listing_title("/blog/"))
+        self.assertEqual("Release notes", listing_title("/docs/release-notes/"))
+
+
+class TestSiteIndex(TempDirMixin, unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.root, "content")
+        self.dest = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        self.write(self.template, "<title>{{ Title }}</title><a href=\"/\">home</a>{{ Content }}")
+        self.index = SiteIndex(self.dest, "https://example.com/")
+        for name, title, mtime in [("index", "Home", 10), ("blog/tom/index", "Tom", 20), ("blog/majesty/index", "Majesty", 30)]:
+            from_path = os.path.join(self.content, f"{name}.md")
+            self.write(from_path, f"# {title}")
+            os.utime(from_path, (mtime, mtime))
+            self.index.record(from_path, os.path.join(self.dest, f"{name}.html"), title)
+        self.templates = TemplateCache(self.template, "/site/")
+
+    def test_sitemap(self):
+        sitemap = self.index.sitemap(self.templates.get(self.template).resolve_url)
+        self.assertIn("<url><loc>https://example.com/site/blog/majesty/</loc><lastmod>1970-01-01</lastmod></url>", sitemap)
+        self.assertEqual(3, sitemap.count("<url>"))
+
+    def test_feed_is_newest_first(self):
+        feed = self.index.feed(self.templates.get(self.template).resolve_url)
+        self.assertLess(feed.index("<title>Majesty</title>"), feed.index("<title>Tom</title>"))
+        self.assertNotIn("<title>Home</title>", feed)
+        self.assertIn("<updated>1970-01-01T00:00:30Z</updated>", feed)
+
+    def test_write_listing_pages(self):
+        self.assertEqual((3, 0), self.index.write(self.templates, self.content))
+        self.assertEqual(
+            "<title>Blog</title><a href=\"/site/\">home</a><div><ul><li><a href=\"/site/blog/majesty/\">Majesty</a></li>"
+            "<li><a href=\"/site/blog/tom/\">Tom</a></li></ul></div>",
+            self.read(os.path.join(self.dest, "blog", "index.html"))
+        )
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "index.html")))
+        self.assertEqual((0, 0), self.index.write(self.templates, self.content))
+
+    def test_optimized_listing_is_kept(self):
+        self.index.write(self.templates, self.content)
+        listing_path = os.path.join(self.dest, "blog", "index.html")
+        self.write(listing_path, "minified")
+        self.assertEqual((0, 0), self.index.write(self.templates, self.content))
+        self.assertEqual("minified", self.read(listing_path))
+        self.assertEqual((3, 0), self.index.write(self.templates, self.content, rewrite=True))
+        self.assertNotEqual("minified", self.read(listing_path))
+
+    def test_stale_listing_is_removed(self):
+        self.index.write(self.templates, self.content)
+        self.index.remove(os.path.join(self.content, "blog", "tom", "index.md"))
+        self.index.remove(os.path.join(self.content, "blog", "majesty", "index.md"))
+        self.assertEqual((2, 1), self.index.write(self.templates, self.content))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog")))
+
+    def test_save_and_load(self):
+        index_path = os.path.join(self.root, ".build", "index.json")
+        self.index.write(self.templates, self.content)
+        self.index.save(index_path)
+        loaded = load_site_index(index_path, self.dest)
+        self.assertEqual(self.index.pages, loaded.pages)
+        self.assertEqual(sorted([os.path.join(self.dest, "blog", "index.html"), os.path.join(self.dest, "sitemap.xml"),
+                                 os.path.join(self.dest, "feed.xml")]), sorted(loaded.outputs))
+        self.assertEqual("https://example.com", loaded.site_url)
+        self.assertEqual("https://example.org", load_site_index(index_path, self.dest, "https://example.org").site_url)
+        self.assertEqual({}, load_site_index(index_path, os.path.join(self.root, "public")).pages)
+
+    def test_sitemap_and_feed_need_a_site_url(self):
+        self.index.write(self.templates, self.content)
+        self.index.site_url = ""
+        self.assertEqual((0, 2), self.index.write(self.templates, self.content))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "sitemap.xml")))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "feed.xml")))
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "blog", "index.html")))
+
+
+if __name__ == "__main__":
+    unittest.main()
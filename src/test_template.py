@@ -0,0 +1,93 @@
+import io
+import os
+import unittest
+from fixtures import TempDirMixin
+from template import Template, TemplateCache, UrlResolver
+
+
+class TestUrlResolver(unittest.TestCase):
+
+    def test_root_relative_url(self):
+        self.assertEqual("/site/blog/tom", UrlResolver("/site/")("/blog/tom"))
+
+    def test_other_urls_unchanged(self):
+        resolve_url = UrlResolver("/site/")
+        self.assertEqual("https://boot.dev", resolve_url("https://boot.dev"))
+        self.assertEqual("images/tom.png", resolve_url("images/tom.png"))
+
+    def test_fingerprinted_assets(self):
+        resolve_url = UrlResolver("/site/", {"index.css": "index.0123456789.css"})
+        self.assertEqual("/site/index.0123456789.css", resolve_url("/index.css"))
+        self.assertEqual("/site/index.0123456789.css?v=1#top", resolve_url("/index.css?v=1#top"))
+        self.assertEqual("/site/blog/tom", resolve_url("/blog/tom"))
+        self.assertEqual("", resolve_url.assets_key(["/blog/tom", "index.css", "https://boot.dev/index.css"]))
+        self.assertEqual(resolve_url.assets_key(["/index.css"]), resolve_url.assets_key(["/blog/tom", "/index.css?v=1"]))
+        self.assertNotEqual(resolve_url.assets_key(["/index.css"]),
+                            UrlResolver("/site/", {"index.css": "index.9876543210.css"}).assets_key(["/index.css"]))
+        self.assertNotEqual(UrlResolver("/site/"), resolve_url)
+
+
+class TestTemplate(unittest.TestCase):
+
+    def test_render(self):
+        template = Template("<title>{{ Title }}</title><article>{{ Content }}</article>")
+        self.assertEqual(
+            "<title>Home</title><article><p>Hi</p></article>",
+            template.render(Title="Home", Content="<p>Hi</p>")
+        )
+
+    def test_repeated_and_unknown_placeholders(self):
+        template = Template("{{ Title }} - {{ Title }} {{ Author }}")
+        self.assertEqual("Home - Home {{ Author }}", template.render(Title="Home"))
+
+    def test_basepath_applied_to_template(self):
+        template = Template("<link href=\"/index.css\" /><img src=\"/a.png\"><a href=\"https://x.y/\">", UrlResolver("/site/"))
+        self.assertEqual(
+            "<link href=\"/site/index.css\" /><img src=\"/site/a.png\"><a href=\"https://x.y/\">",
+            template.render()
+        )
+
+    def test_rendered_values_are_not_rewritten(self):
+        template = Template("{{ Content }}", UrlResolver("/site/"))
+        self.assertEqual("<a href=\"/raw\">", template.render(Content="<a href=\"/raw\">"))
+
+
+    def test_write_streams_iterable_values(self):
+        template = Template("<title>{{ Title }}</title><article>{{ Content }}</article>")
+        file = io.StringIO()
+        template.write(file, Title="Home", Content=iter(["<p>", "Hi", "</p>"]))
+        self.assertEqual("<title>Home</title><article><p>Hi</p></article>", file.getvalue())
+
+    def test_repeated_placeholder_with_streamed_value(self):
+        template = Template("{{ Content }}|{{ Content }}")
+        self.assertEqual("ab|ab", "".join(template.iter_render(Content=iter(["a", "b"]))))
+
+
+class TestTemplateCache(TempDirMixin, unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.default = os.path.join(self.root, "template.html")
+        self.blog = os.path.join(self.root, "content", "blog")
+        for path in [self.default, os.path.join(self.blog, "_template.html"), os.path.join(self.root, "post.html")]:
+            self.write(path, f"<a href=\"/\">{os.path.basename(path)}</a>{{{{ Content }}}}")
+        self.templates = TemplateCache(self.default, "/site/", {self.blog: os.path.join(self.blog, "_template.html")})
+
+    def test_directory_templates_apply_to_subdirectories(self):
+        self.assertEqual(os.path.join(self.blog, "_template.html"), self.templates.template_path(os.path.join(self.blog, "tom", "index.md")))
+        self.assertEqual(self.default, self.templates.template_path(os.path.join(self.root, "content", "index.md")))
+
+    def test_front_matter_overrides_directory_template(self):
+        self.assertEqual(os.path.join(self.root, "post.html"),
+                         self.templates.template_path(os.path.join(self.blog, "index.md"), {"template": "post.html"}))
+
+    def test_templates_are_compiled_once(self):
+        template = self.templates.select(os.path.join(self.blog, "index.md"))
+        self.assertIs(template, self.templates.select(os.path.join(self.blog, "tom", "index.md")))
+        self.assertEqual("<a href=\"/site/\">_template.html</a>", template.render(Content=""))
+        self.templates.select(os.path.join(self.root, "content", "index.md"))
+        self.assertEqual(2, len(self.templates))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -358,5 +358,33 @@ class TestTextToTextnodes(unittest.TestCase):
         )
 
 
+    def test_lower_priority_delimiters_inside_bold(self):
+        text = "**bold with *star* and `tick`** after"
+        textnodes = text_to_textnodes(text)
+        self.assertListEqual(
+            [
+                TextNode("bold with *star* and `tick`", TextType.BOLD),
+                TextNode(" after", TextType.TEXT),
+            ],
+            textnodes,
+        )
+
+    def test_link_inside_emphasis(self):
+        text = "*see [docs](https://boot.dev) now*"
+        textnodes = text_to_textnodes(text)
+        self.assertListEqual(
+            [
+                TextNode("see ", TextType.TEXT),
+                TextNode("docs", TextType.LINK, "https://boot.dev"),
+                TextNode(" now", TextType.TEXT),
+            ],
+            textnodes,
+        )
+
+    def test_higher_priority_delimiter_inside_open_one(self):
+        with self.assertRaises(ValueError):
+            text_to_textnodes("*italic **bold** text*")
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,39 @@
+import os
+import unittest
+from fixtures import TempDirMixin
+from walker import walk_files
+
+
+class TestWalkFiles(TempDirMixin, unittest.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        for rel_path in ["b.md", "a/z.md", "a/b/c.md", "a/notes.txt", "c.md", "drafts/d.md", "a/drafts/e.md", ".hidden.md"]:
+            self.write(os.path.join(self.root, *rel_path.split("/")), rel_path)
+
+    def walk(self, include=None, exclude=None):
+        return [rel_path for _, rel_path in walk_files(self.root, include, exclude)]
+
+    def test_depth_first_in_name_order(self):
+        self.assertListEqual(
+            [".hidden.md", "a/b/c.md", "a/drafts/e.md", "a/notes.txt", "a/z.md", "b.md", "c.md", "drafts/d.md"],
+            self.walk()
+        )
+
+    def test_include_and_exclude(self):
+        self.assertListEqual(["a/b/c.md", "a/z.md", "b.md", "c.md"], self.walk(["*.md"], ["drafts", ".*"]))
+        self.assertListEqual(["a/b/c.md", "a/drafts/e.md", "a/notes.txt", "a/z.md"], self.walk(["a/*"]))
+        self.assertListEqual(["a/notes.txt"], self.walk(exclude=["*.md"]))
+        self.assertListEqual(["a/b/c.md", "a/z.md"], self.walk(["a/*.md"], ["a/drafts"]))
+
+    def test_entries_have_paths(self):
+        entry, rel_path = next(walk_files(self.root, ["c.md"]))
+        self.assertEqual(os.path.join(self.root, "a", "b", "c.md"), entry.path)
+        self.assertEqual("a/b/c.md", rel_path)
+
+    def test_missing_root(self):
+        self.assertListEqual([], list(walk_files(os.path.join(self.root, "missing"))))
+
+
+if __name__ == "__main__":
+    unittest.main()
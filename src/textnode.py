@@ -1,7 +1,6 @@
 from enum import Enum
 from htmlnode import LeafNode
 import re
-from functools import reduce
 
 class TextType(Enum):
     TEXT = "text"
@@ -12,7 +11,22 @@ class TextType(Enum):
     IMAGE = "image"
 
 
+INLINE_DELIMITERS = {"**": TextType.BOLD, "*": TextType.ITALIC, "_": TextType.ITALIC, "`": TextType.CODE}
+# The delimiters nest by priority (** over * over _ over `): while one is open, the
+# delimiters of higher priority can't appear inside it and lower ones are literal text.
+DELIMITER_STOP_PATTERNS = {
+    None: re.compile(r"[*_`]"),
+    "**": re.compile(r"\*\*"),
+    "*": re.compile(r"\*"),
+    "_": re.compile(r"[*_]"),
+    "`": re.compile(r"[*_`]"),
+}
+INLINE_MEDIA_PATTERN = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)|(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)")
+
+
 class TextNode:
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text, text_type, url=None):
         self.text = text
         self.text_type = text_type
@@ -25,7 +39,7 @@ class TextNode:
         return f"TextNode({self.text}, {self.text_type.value}, {self.url})"
     
 
-def text_node_to_html_node(text_node):
+def text_node_to_html_node(text_node, resolve_url=None):
     match text_node.text_type:
         case TextType.TEXT:
             return LeafNode(None, text_node.text)
@@ -36,9 +50,9 @@ def text_node_to_html_node(text_node):
         case TextType.CODE:
             return LeafNode("code", text_node.text)
         case TextType.LINK:
-            return LeafNode("a", text_node.text, {"href": text_node.url})
+            return LeafNode("a", text_node.text, {"href": resolve_url(text_node.url) if resolve_url else text_node.url})
         case TextType.IMAGE:
-            return LeafNode("img", "", {"src": text_node.url, "alt": text_node.text})
+            return LeafNode("img", "", {"src": resolve_url(text_node.url) if resolve_url else text_node.url, "alt": text_node.text})
         case _:
             raise ValueError(f"invalid text type: {text_node.text_type}")
         
@@ -114,11 +128,45 @@ def extract_markdown_links(text):
 
 
 def text_to_textnodes(text):
-    delimiters = {'**':TextType.BOLD, "*":TextType.ITALIC, "_":TextType.ITALIC, "`":TextType.CODE}
-    return split_nodes_link(
-        split_nodes_image(
-            reduce(lambda accumulator, delimiter: split_nodes_delimiter(accumulator, delimiter, delimiters[delimiter]), 
-                    delimiters, 
-                    [TextNode(text, TextType.TEXT)])
-            )
-        )
\ No newline at end of file
+    nodes = []
+    open_delimiter = None
+    position = 0
+    while True:
+        match = DELIMITER_STOP_PATTERNS[open_delimiter].search(text, position)
+        end = match.start() if match else len(text)
+        append_inline_nodes(nodes, text, position, end, INLINE_DELIMITERS.get(open_delimiter, TextType.TEXT))
+        if not match:
+            if open_delimiter:
+                raise ValueError(f"Invalid Markdown syntax. Matching closing delimiter '{open_delimiter}' isn't found.")
+            return nodes
+        delimiter = "**" if text.startswith("**", end) else text[end]
+        if open_delimiter is None:
+            open_delimiter = delimiter
+        elif delimiter == open_delimiter:
+            open_delimiter = None
+        else:
+            raise ValueError(f"Invalid Markdown syntax. Matching closing delimiter '{open_delimiter}' isn't found.")
+        position = end + len(delimiter)
+
+
+def append_inline_nodes(nodes, text, start, end, text_type):
+    if start == end:
+        return
+    if text.find("[", start, end) == -1:
+        nodes.append(TextNode(text[start:end], text_type))
+        return
+    position = start
+    has_media = False
+    for match in INLINE_MEDIA_PATTERN.finditer(text, start, end):
+        has_media = True
+        if match.start() > position:
+            nodes.append(TextNode(text[position:match.start()], TextType.TEXT))
+        if match[2] is not None:
+            nodes.append(TextNode(match[1], TextType.IMAGE, match[2]))
+        else:
+            nodes.append(TextNode(match[3], TextType.LINK, match[4]))
+        position = match.end()
+    if not has_media:
+        nodes.append(TextNode(text[start:end], text_type))
+    elif position < end:
+        nodes.append(TextNode(text[position:end], TextType.TEXT))
@@ -0,0 +1,33 @@
+import os
+from fnmatch import fnmatchcase
+
+
+def matches(rel_path, name, patterns):
+    return any(fnmatchcase(rel_path, pattern) or fnmatchcase(name, pattern) for pattern in patterns)
+
+
+def sorted_entries(dir_path):
+    try:
+        with os.scandir(dir_path) as entries:
+            return sorted(entries, key=lambda entry: entry.name)
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+
+def walk_files(root, include=None, exclude=None):
+    # Depth first in name order, so builds see the same sequence on every filesystem.
+    # Only the entries of the directories on the current path are held in memory.
+    stack = [("", iter(sorted_entries(root)))]
+    while stack:
+        rel_dir, entries = stack[-1]
+        entry = next(entries, None)
+        if entry is None:
+            stack.pop()
+            continue
+        rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+        if exclude and matches(rel_path, entry.name, exclude):
+            continue
+        if entry.is_dir():
+            stack.append((rel_path, iter(sorted_entries(entry.path))))
+        elif entry.is_file() and (not include or matches(rel_path, entry.name, include)):
+            yield entry, rel_path